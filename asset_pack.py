@@ -0,0 +1,132 @@
+import json
+import os
+import struct
+import sys
+from logger_config import logger
+
+try:
+    from PyQt6 import QtCore, QtGui
+except ImportError:  # the build step does not need Qt
+    QtCore = QtGui = None
+
+# GUI assets packed into one file, so a cold start does one sequential read instead of opening
+# every PNG in assets/. Build (or rebuild after changing assets/) with:
+#     python asset_pack.py
+# Layout: magic, uint32 index length, JSON index {name: [offset, size, mtime_ns]}, then the files
+# back to back, unmodified. Images are only decoded the first time they are asked for and then
+# cached. Without a pack file, assets are read from assets/ one by one as before; so is any file
+# in assets/ whose size or modification time no longer matches what was packed.
+
+ASSETS_DIR = "assets"
+PACK_FILE = "assets.pack"
+MAGIC = b"DTAP"
+
+
+def build(assets_dir=ASSETS_DIR, pack_file=PACK_FILE):
+    """Packs every file in assets_dir into pack_file. Returns the number of files packed."""
+    names = sorted(n for n in os.listdir(assets_dir) if os.path.isfile(os.path.join(assets_dir, n)))
+    blobs, index, offset = [], {}, 0
+    for name in names:
+        path = os.path.join(assets_dir, name)
+        with open(path, "rb") as f:
+            data = f.read()
+        index[name] = [offset, len(data), os.stat(path).st_mtime_ns]
+        blobs.append(data)
+        offset += len(data)
+    header = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    tmp = pack_file + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp, pack_file)
+    return len(names)
+
+
+class AssetPack:
+    def __init__(self, pack_file=PACK_FILE, assets_dir=ASSETS_DIR):
+        self.pack_file = pack_file
+        self.assets_dir = assets_dir
+        self._blob = None
+        self._index = None
+        self._pixmaps = {}
+        self._icons = {}
+
+    def _load(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        try:
+            with open(self.pack_file, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            logger.info(f"No {self.pack_file}; loading GUI assets from {self.assets_dir}/ (run asset_pack.py to build it).")
+            return
+        if blob[:4] != MAGIC:
+            logger.error(f"{self.pack_file} is not an asset pack; loading GUI assets from {self.assets_dir}/.")
+            return
+        (length,) = struct.unpack("<I", blob[4:8])
+        index = json.loads(blob[8:8 + length])
+        start = 8 + length
+        self._blob = memoryview(blob)
+        self._index = {name: (start + entry[0], entry[1], entry[2] if len(entry) > 2 else None)
+                       for name, entry in index.items()}
+
+    def data(self, name):
+        """Raw bytes of an asset, from the pack if it has it, else from the assets folder."""
+        self._load()
+        entry = self._index.get(name)
+        path = os.path.join(self.assets_dir, name)
+        if entry is not None:
+            offset, size, mtime_ns = entry
+            if self._packed_is_current(path, size, mtime_ns):
+                return self._blob[offset:offset + size].tobytes()
+            logger.warning(f"{self.pack_file} is out of date for {name}; using {path} (run asset_pack.py to rebuild).")
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _packed_is_current(path, size, mtime_ns):
+        """A stat is cheap next to opening and reading; the file itself is only read if it changed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True  # shipped without assets/, the pack is all there is
+        return st.st_size == size and st.st_mtime_ns == mtime_ns
+
+    def pixmap(self, name):
+        pixmap = self._pixmaps.get(name)
+        if pixmap is None:
+            pixmap = QtGui.QPixmap()
+            try:
+                if not pixmap.loadFromData(self.data(name)):
+                    logger.error(f"Could not decode asset {name}.")
+            except OSError as e:
+                logger.error(f"Missing asset {name}: {e}")
+            self._pixmaps[name] = pixmap
+        return pixmap
+
+    def icon(self, name):
+        icon = self._icons.get(name)
+        if icon is None:
+            icon = self._icons[name] = QtGui.QIcon(self.pixmap(name))
+        return icon
+
+    def font_family(self, name):
+        """Registers a font asset with Qt and returns its family name, or None."""
+        try:
+            font_id = QtGui.QFontDatabase.addApplicationFontFromData(QtCore.QByteArray(self.data(name)))
+        except OSError as e:
+            logger.error(f"Missing asset {name}: {e}")
+            return None
+        if font_id == -1:
+            return None
+        return QtGui.QFontDatabase.applicationFontFamilies(font_id)[0]
+
+
+assets = AssetPack()
+
+
+if __name__ == "__main__":
+    count = build(*sys.argv[1:3])
+    print(f"Packed {count} files into {sys.argv[2] if len(sys.argv) > 2 else PACK_FILE}.")
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import wave
+import numpy as np
+from logger_config import logger
+
+try:
+    import soundfile as sf
+except ImportError:  # optional, WAV still decodes through the wave module and the rest through ffmpeg
+    sf = None
+
+# Decoding straight to numpy. Short clips make up most of a soundboard, and going through pydub
+# costs an ffmpeg process plus a temp file per clip. WAV/OGG/FLAC are decoded in process with
+# soundfile (libsndfile); everything else, or everything when soundfile is missing, is piped out
+# of ffmpeg as raw PCM without touching the disk.
+
+SOUNDFILE_EXTENSIONS = (".wav", ".ogg", ".flac")
+
+
+def decode(path, sample_rate):
+    """Returns (frames, channels) int16 PCM of the file at sample_rate, in its own channel count."""
+    ext = os.path.splitext(path)[1].lower()
+    if sf is not None and ext in SOUNDFILE_EXTENSIONS:
+        try:
+            data, rate = sf.read(path, dtype='int16', always_2d=True)
+            return resample(downmix(data), rate, sample_rate)
+        except Exception as e:
+            logger.warning(f"soundfile could not decode {path}, falling back to ffmpeg: {e}")
+    elif ext == ".wav":
+        try:
+            return _decode_wave(path, sample_rate)
+        except (wave.Error, EOFError):
+            pass  # not 16-bit PCM; let ffmpeg handle it
+    return _decode_ffmpeg(path, sample_rate)
+
+
+def _decode_wave(path, sample_rate):
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise wave.Error("not 16-bit PCM")
+        channels, rate = f.getnchannels(), f.getframerate()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).reshape((-1, channels))
+    return resample(downmix(pcm), rate, sample_rate)
+
+
+def _decode_ffmpeg(path, sample_rate):
+    channels = probe_channels(path)
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path, "-f", "s16le", "-acodec", "pcm_s16le",
+           "-ac", str(channels), "-ar", str(sample_rate), "-"]
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+                            creationflags=creationflags)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {result.stderr.decode(errors='replace').strip()}")
+    usable = len(result.stdout) - len(result.stdout) % (2 * channels)
+    return np.frombuffer(result.stdout[:usable], dtype=np.int16).reshape((-1, channels))
+
+
+def probe_channels(path):
+    """Mono stays mono, anything with more channels is decoded as stereo."""
+    if sf is not None:
+        try:
+            return 1 if sf.info(path).channels == 1 else 2
+        except Exception:
+            pass
+    return 2
+
+
+def downmix(pcm):
+    """
+    Folds int16 PCM with more than two channels down to stereo, as ffmpeg's -ac 2 does for the
+    other decode path; the mixer only handles mono and stereo. Even-numbered channels go left and
+    odd-numbered ones right, averaged so the result cannot clip.
+    """
+    if pcm.shape[1] <= 2:
+        return pcm
+    out = np.empty((pcm.shape[0], 2), dtype=np.int16)
+    out[:, 0] = np.rint(pcm[:, 0::2].mean(axis=1))
+    out[:, 1] = np.rint(pcm[:, 1::2].mean(axis=1))
+    return out
+
+
+def probe_duration(path):
+    """Duration in seconds, read from the header (or ffprobe) without decoding; None if unknown."""
+    if sf is not None:
+        try:
+            info = sf.info(path)
+            if info.frames > 0:
+                return info.frames / info.samplerate
+        except Exception:
+            pass
+    if path.lower().endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as f:
+                return f.getnframes() / f.getframerate()
+        except (wave.Error, EOFError, OSError):
+            pass
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", path]
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False,
+                                creationflags=creationflags)
+        return float(result.stdout.decode().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def resample(pcm, rate, sample_rate):
+    """Linear-interpolation resampling of int16 PCM, vectorized per channel."""
+    if rate == sample_rate or len(pcm) < 2:
+        return pcm
+    frames = max(1, int(round(len(pcm) * sample_rate / rate)))
+    positions = np.arange(frames) * (rate / sample_rate)
+    source = np.arange(len(pcm))
+    out = np.empty((frames, pcm.shape[1]), dtype=np.int16)
+    for ch in range(pcm.shape[1]):
+        out[:, ch] = np.rint(np.interp(positions, source, pcm[:, ch]))
+    return out
+
+
+def write_audio(path, pcm, sample_rate):
+    """Writes (frames, channels) int16 PCM; the format follows the file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if sf is not None and ext in SOUNDFILE_EXTENSIONS:
+        sf.write(path, pcm, sample_rate)
+    elif ext == ".wav":
+        with wave.open(path, "wb") as f:
+            f.setnchannels(pcm.shape[1])
+            f.setsampwidth(2)
+            f.setframerate(sample_rate)
+            f.writeframes(np.ascontiguousarray(pcm).tobytes())
+    else:
+        from pydub import AudioSegment
+        AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=sample_rate,
+                     channels=pcm.shape[1]).export(path, format=ext.lstrip("."))
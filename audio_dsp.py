@@ -0,0 +1,167 @@
+import numpy as np
+
+# Block-based DSP stages used by the mixer. Everything here runs on the audio thread, so each
+# stage works on whole blocks with numpy, keeps its own state between callbacks and reuses
+# its buffers instead of allocating per block.
+
+
+def db_to_gain(db):
+    return 10 ** (db / 20.0)
+
+
+def gain_to_db(gain):
+    return 20.0 * np.log10(max(gain, 1e-10))
+
+
+class MicProcessor:
+    """
+    Mic input stage: input gain followed by an RMS noise gate with attack/release smoothing.
+    process() returns None for blocks the gate holds fully closed, so the mixer can skip
+    the mic entirely while the user is silent.
+    """
+
+    def __init__(self, sample_rate, gain_db=-3.0, gate_enabled=True, threshold_db=-50.0,
+                 attack_ms=5.0, release_ms=150.0, hysteresis_db=6.0):
+        self.gate_gain = 0.0
+        self.level_db = -120.0
+        self._buf = None
+        self._steps = None
+        self.configure(sample_rate, gain_db, gate_enabled, threshold_db, attack_ms, release_ms, hysteresis_db)
+
+    def configure(self, sample_rate, gain_db=-3.0, gate_enabled=True, threshold_db=-50.0,
+                  attack_ms=5.0, release_ms=150.0, hysteresis_db=6.0):
+        self.sample_rate = sample_rate
+        self.gain = db_to_gain(gain_db)
+        self.gate_enabled = gate_enabled
+        self.open_threshold = db_to_gain(threshold_db)
+        # Close a little below the open threshold so the gate does not chatter on borderline levels
+        self.close_threshold = db_to_gain(threshold_db - hysteresis_db)
+        self.attack_samples = max(attack_ms, 0.1) * sample_rate / 1000.0
+        self.release_samples = max(release_ms, 0.1) * sample_rate / 1000.0
+        self._steps = None
+        if not gate_enabled:
+            self.gate_gain = 1.0
+
+    def process(self, indata):
+        """indata: (frames, 1) float32 mic block. Returns a (frames, 1) buffer or None when gated."""
+        frames = indata.shape[0]
+        if self._buf is None or self._buf.shape[0] != frames:
+            self._buf = np.empty((frames, 1), dtype=np.float32)
+            self._steps = None
+        # Measured before any gating so the level meter and stats also work with the gate off
+        rms = float(np.sqrt(np.mean(np.square(indata))))
+        self.level_db = gain_to_db(rms)
+        if not self.gate_enabled:
+            np.multiply(indata, self.gain, out=self._buf)
+            return self._buf
+
+        g0 = self.gate_gain
+        if rms >= self.open_threshold:
+            target = 1.0
+        elif rms < self.close_threshold:
+            target = 0.0
+        else:
+            target = 1.0 if g0 >= 0.5 else 0.0
+
+        if target == 0.0 and g0 < 1e-3:
+            # Silence fast path: gate is shut, nothing to mix
+            self.gate_gain = 0.0
+            return None
+        if target == 1.0 and g0 > 0.9999:
+            self.gate_gain = 1.0
+            np.multiply(indata, self.gain, out=self._buf)
+            return self._buf
+
+        # One-pole envelope towards target, evaluated in closed form over the whole block
+        tau = self.attack_samples if target > g0 else self.release_samples
+        if self._steps is None:
+            self._steps = np.arange(1, frames + 1, dtype=np.float32).reshape(-1, 1)
+        envelope = np.exp(self._steps * np.float32(-1.0 / tau))
+        envelope *= (g0 - target)
+        envelope += target
+        self.gate_gain = float(envelope[-1, 0])
+        envelope *= self.gain
+        np.multiply(indata, envelope, out=self._buf)
+        return self._buf
+
+
+class PeakLimiter:
+    """
+    Look-ahead peak limiter for the output stage. The signal is delayed by the look-ahead
+    time so gain reduction can ramp in before a peak arrives instead of jumping on it.
+    Per block: required attenuation per sample -> max-hold over the look-ahead window ->
+    exponential release -> moving average over the window. All steps are vectorized and
+    their history is carried across callbacks, so consecutive blocks join smoothly.
+    """
+
+    def __init__(self, sample_rate, ceiling_db=-0.3, lookahead_ms=1.5, release_ms=80.0, channels=2):
+        self.channels = channels
+        self.gain_reduction_db = 0.0
+        self.configure(sample_rate, ceiling_db, lookahead_ms, release_ms)
+
+    def configure(self, sample_rate, ceiling_db=-0.3, lookahead_ms=1.5, release_ms=80.0):
+        self.sample_rate = sample_rate
+        self.ceiling = db_to_gain(ceiling_db)
+        self.lookahead = max(1, int(round(lookahead_ms * sample_rate / 1000.0)))
+        self.log_release = -1.0 / max(release_ms * sample_rate / 1000.0, 1.0)
+        self.reset()
+
+    def reset(self):
+        L = self.lookahead
+        self._ext = np.zeros((L, self.channels), dtype=np.float32)  # delay line + current block
+        self._hold_hist = np.zeros(L, dtype=np.float32)   # required attenuation, last L input samples
+        self._env_hist = np.zeros(L, dtype=np.float32)    # released attenuation, last L output samples
+        self._atten = 0.0
+        self._window = np.full(L + 1, 1.0 / (L + 1), dtype=np.float32)
+        self.gain_reduction_db = 0.0
+
+    @property
+    def latency_samples(self):
+        return self.lookahead
+
+    def process(self, block, out):
+        """Limits block (frames, channels) into out. block and out may be the same array."""
+        frames = block.shape[0]
+        L = self.lookahead
+        if self._ext.shape[0] != frames + L:
+            ext = np.zeros((frames + L, self.channels), dtype=np.float32)
+            ext[:L] = self._ext[:L]
+            self._ext = ext
+        ext = self._ext
+        ext[L:] = block
+
+        peaks = np.max(np.abs(block), axis=1)
+        required = np.maximum(1.0 - self.ceiling / np.maximum(peaks, 1e-9), 0.0).astype(np.float32)
+
+        if self._atten < 1e-6 and not required.any() and not self._hold_hist.any():
+            # Nothing to limit and nothing ramping: just emit the delayed signal
+            out[:] = ext[:frames]
+            self._env_hist[:] = 0.0
+            self._hold_hist[:] = 0.0
+            self.gain_reduction_db = 0.0
+        else:
+            # Look-ahead hold: each output sample takes the worst attenuation of the next L samples
+            required_ext = np.concatenate((self._hold_hist, required))
+            hold = np.lib.stride_tricks.sliding_window_view(required_ext, L + 1).max(axis=1)
+            self._hold_hist = required_ext[-L:].copy()
+
+            # Release: env[n] = max(hold[n], env[n-1] * r), solved with a cumulative max in log space
+            n = np.arange(frames, dtype=np.float64)
+            log_hold = np.log(np.maximum(hold, 1e-9)) - n * self.log_release
+            np.maximum.accumulate(log_hold, out=log_hold)
+            np.maximum(log_hold, np.log(max(self._atten, 1e-9)) + self.log_release, out=log_hold)
+            env = np.exp(log_hold + n * self.log_release).astype(np.float32)
+            self._atten = float(env[-1])
+
+            # Smooth the attack over the look-ahead window
+            env_ext = np.concatenate((self._env_hist, env))
+            smoothed = np.convolve(env_ext, self._window, mode='valid')
+            self._env_hist = env_ext[-L:].copy()
+
+            gain = 1.0 - smoothed
+            self.gain_reduction_db = float(-gain_to_db(float(gain.min())))
+            np.multiply(ext[:frames], gain[:, None], out=out)
+
+        # Keep the last L input samples as the head of the next block's delay line
+        ext[:L] = ext[frames:frames + L].copy()
+        return out
@@ -1,18 +1,73 @@
 import sounddevice as sd
 import numpy as np
-from pydub import AudioSegment
 import os
+import time
+from time import perf_counter
+import heapq
+import itertools
 import threading
-import random
-from logger_config import logger
+from collections import deque
+from logger_config import logger, rt_events
+from tone_bank import find_speaktone_file, load_tone_bank, render_tts, voice_variation
+from audio_dsp import MicProcessor, PeakLimiter, db_to_gain
+from device_registry import DeviceRegistry, common_sample_rate
+from sample_store import buffer_frames, from_decoded, mix_into, to_float
+from audio_decoder import decode, write_audio
+from streaming_source import StreamingSource, should_stream
+from macro_timeline import MacroLibrary
+from output_recorder import OutputRecorder
+from latency_trace import tracer
+from memory_accounting import MemoryMonitor
+from stream_tuning import LATENCY_STEPS, LatencyTuner
+from audio_routing import OutputRing, RoutingGraph
+
+COMMAND_QUEUE_SIZE = 1024
 
 class AudioManager:
     def __init__(self, settings_manager):
         self.settings = settings_manager
         self.stream = None
+        self.stream_kind = None  # 'duplex' (mic + output) or 'output' (effects only)
+        self._stream_token = None  # identifies the main stream whose callback may mix
+        self.blocksize, self.latency = LATENCY_STEPS[0]
+        self.peak_callback_load = 0.0  # highest mix time / block time since the tuner last looked
+        self.mic_device_id = None
+        self.output_device_id = None
         self.active_effects = []
         self.is_running = False
+        # Guards control-side state (tone banks, config, stream open/close). The audio callbacks
+        # never take it: they only see what control threads post to _commands.
         self.lock = threading.Lock()
+        self._commands = deque()
+        self._mix_lock = threading.Lock()  # only contended by two main streams during a mode swap
+        self.finished_voices = None  # set to a deque to be told which voices ended (engine process)
+        self._tone_banks = {}
+        self._effect_cache = {}  # resolved path -> (decode key, buffer), least recently used first
+        self.mode = "merged"
+        self.mic_processor = None
+        self.limiter = None
+        self.devices = DeviceRegistry()
+        self.macros = MacroLibrary(self)
+        self.memory = MemoryMonitor(self)
+        self.tuner = LatencyTuner(self)
+        self._scratch = np.zeros((0, 2), dtype=np.float32)
+        # Scheduled voices: heap of (sample_time, seq, buffer) on the stream's sample clock
+        self._scheduled = []
+        self._schedule_seq = itertools.count()
+        self._sample_clock = 0            # frames mixed since the main stream started
+        self._clock_anchor = None         # (outputBufferDacTime, sample_clock) of the last block
+        self.routing = None
+        self._output_rings = {}  # output name -> OutputRing; replaced, never mutated, so the mixer can iterate it
+        self.extra_streams = {}  # output name -> stream, for "extra_outputs"
+        self._last_tts = None  # (temp file, mtime, buffer) of the last generate_tts_audio
+        self.recorder = None         # control side; set as soon as a recording starts
+        self._mix_recorder = None    # the mixer's copy, swapped in through the command queue
+        self.negotiated_rate = None  # device-native rate picked at stream start, overrides "sample_rate"
+        self.rate_listener = None    # called with the new rate after a switch (engine process)
+        # Held by every path that opens, closes or swaps streams: the GUI, the latency tuner and
+        # the rate negotiation thread all do. Reentrant so those paths can call each other.
+        self._reconfigure_lock = threading.RLock()
+        self._negotiation_cancel = threading.Event()
         self.reload_config()
         self.mute_effects = False
         self.preview_stream = None
@@ -24,29 +79,55 @@ class AudioManager:
             self.effects_volume_db = self.settings.get("effects_volume_db")
             if self.effects_volume_db is None:
                 self.effects_volume_db = -18
-            self.sample_rate = self.settings.get("sample_rate") or 44100
+            self.sample_rate = self.negotiated_rate or self.settings.get("sample_rate") or 44100
             self.sound_effects_path = self.settings.get("sound_effects_path") or "sounds/"
             self.temp_tts_filename = self.settings.get("temp_tts_filename") or "temp_tts.wav"
             self.tts_pause_ms = self.settings.get("tts_pause_ms") or 100
+            self.store_dtype = self.settings.get("sample_store_dtype") or "int16"
+            self.streaming_min_seconds = self.settings.get("streaming_min_seconds") or 0
+            self.streaming_ring_seconds = self.settings.get("streaming_ring_seconds") or 4.0
             self.speak_tone, self.variated_speak_tones = self._load_speak_tone()
-            self.mode = "merged"
+            self._tone_banks = {}
+            self._effect_cache = {}
+            self._post('gain', db_to_gain(self.effects_volume_db))
+            self._post_processors()
             logger.info(f"Config loaded: sample_rate={self.sample_rate}, effects_volume_db={self.effects_volume_db}")
 
+    def _post_processors(self):
+        """Builds mic, limiter and routing stages for the current sample rate and hands them to the mixer."""
+        mic_settings = (
+            self.sample_rate,
+            self.settings.get("mic_gain_db"),
+            bool(self.settings.get("noise_gate_enabled")),
+            self.settings.get("noise_gate_threshold_db"),
+            self.settings.get("noise_gate_attack_ms"),
+            self.settings.get("noise_gate_release_ms"),
+        )
+        limiter_settings = (
+            self.sample_rate,
+            self.settings.get("limiter_ceiling_db"),
+            self.settings.get("limiter_lookahead_ms"),
+            self.settings.get("limiter_release_ms"),
+        )
+        # Fresh processors are swapped in by the callback instead of reconfiguring live ones
+        self._post('dsp', MicProcessor(*mic_settings), PeakLimiter(*limiter_settings))
+        self._post('routing', RoutingGraph(self.settings.get("routing"), limiter_settings))
+
     def get_audio_devices(self):
-        devices = sd.query_devices()
-        hostapis = sd.query_hostapis()
-        input_devices, output_devices = [], []
-        for device in devices:
-            try:
-                hostapi_name = hostapis[device['hostapi']]['name']
-                device_name = f"{device['name']}, {hostapi_name}"
-                if device['max_input_channels'] > 0:
-                    input_devices.append(device_name)
-                if device['max_output_channels'] > 0:
-                    output_devices.append(device_name)
-            except Exception as e:
-                logger.error(f"Could not query device '{device.get('name', 'Unknown')}': {e}")
-        return input_devices, output_devices
+        return self.devices.names()
+
+    def rescan_devices(self):
+        # Re-initializing PortAudio would close running streams, so only do it while stopped
+        self.devices.rescan(reinitialize=not self.is_running)
+
+    def resolve_device(self, device_name, kind):
+        """Maps a "name, hostapi" menu entry to a PortAudio index, rescanning once on a miss."""
+        try:
+            return self.devices.resolve(device_name, kind)
+        except ValueError:
+            logger.info(f"Device '{device_name}' not in cache, rescanning.")
+            self.rescan_devices()
+            return self.devices.resolve(device_name, kind)
 
     def start_audio_processing(self, mic_device_id, output_device_id, preview_output_device_id=None, preview_enabled=False):
         if self.is_running:
@@ -54,362 +135,784 @@ class AudioManager:
         self.is_running = True
         self.preview_enabled = preview_enabled
         self.preview_device_id = preview_output_device_id
+        self.mic_device_id = mic_device_id
+        self.output_device_id = output_device_id
+        self._clock_anchor = None
+        autotune = bool(self.settings.get("latency_autotune"))
+        if autotune:
+            pair_key = f"{self.devices.key_for(mic_device_id)} | {self.devices.key_for(output_device_id)}"
+            self.blocksize, self.latency = LATENCY_STEPS[self.tuner.load(pair_key)]
+        else:
+            self.blocksize, self.latency = LATENCY_STEPS[0]
 
-        try:
-            # Main stream to virtual cable output
-            self.stream = sd.Stream(
+        with self._reconfigure_lock:
+            try:
+                # Main stream to virtual cable output
+                kind = 'duplex' if self._needs_mic(self.mode) else 'output'
+                self.stream, self._stream_token = self._open_main_stream(kind)
+                self.stream_kind = kind
+                self.stream.start()
+                logger.info(f"Audio stream (main output, {kind}, blocksize={self.blocksize}, latency={self.latency}) started successfully.")
+
+                # If preview is enabled, open a second output stream to speakers
+                if self.preview_enabled and self.preview_device_id is not None:
+                    self.preview_stream = self._open_preview_stream()
+                    self.preview_stream.start()
+                    logger.info("Preview audio stream to speakers started successfully.")
+                else:
+                    self.preview_stream = None
+                self._open_extra_outputs()
+
+            except Exception as e:
+                logger.error(f"CRITICAL ERROR starting audio streams: {e}", exc_info=True)
+                self.is_running = False
+                if self.stream is not None:
+                    self.stream.close()
+                    self.stream = None
+                    self.stream_kind = None
+                # Most often a device went away; enumerate again next time the menus are filled
+                self.devices.invalidate()
+                return False
+        if autotune:
+            self.tuner.start()
+        if self.settings.get("negotiate_sample_rate"):
+            # A fresh event per start, so a negotiation left over from the last session stays cancelled
+            self._negotiation_cancel = threading.Event()
+            threading.Thread(target=self.negotiate_sample_rate, args=(self._negotiation_cancel,),
+                             name="rate-negotiation", daemon=True).start()
+        elif self.negotiated_rate:
+            logger.info("Sample rate negotiation is off; the configured rate applies from the next reload.")
+            self.negotiated_rate = None
+        return True
+
+    def stop_audio_processing(self):
+        if not self.is_running:
+            return
+        with self._reconfigure_lock:
+            # A tuner step or rate switch in progress has finished by now; these stop any further ones
+            self.tuner.stop(wait=False)
+            self._negotiation_cancel.set()
+            if self.stream:
+                self.stream.stop()
+                self.stream.close()
+                self.stream = None
+                self.stream_kind = None
+                self._stream_token = None
+            if self.preview_stream:
+                self._close_output('preview', self.preview_stream)
+                self.preview_stream = None
+            for name in list(self.extra_streams):
+                self._close_output(name, self.extra_streams.pop(name))
+            self.is_running = False
+        # Joined outside the lock: the tuner thread may be waiting for it to apply a step
+        self.tuner.stop()
+        self.stop_all_sounds()
+        self.stop_recording()
+        logger.info("All audio streams stopped.")
+
+
+    def _needs_mic(self, mode):
+        return mode in ("merged", "pass-through")
+
+    def _open_main_stream(self, kind):
+        """
+        Opens (but does not start) a main stream. Returns (stream, token); only the callback of the
+        stream whose token is current mixes, any other outputs silence until it is closed.
+        """
+        token = object()
+        if kind == 'duplex':
+            stream = sd.Stream(
                 samplerate=self.sample_rate,
-                blocksize=0,
-                device=(mic_device_id, output_device_id),
+                blocksize=self.blocksize,
+                device=(self.mic_device_id, self.output_device_id),
                 channels=(1, 2),
                 dtype='float32',
-                latency='low',
-                callback=self._processing_callback
+                latency=self.latency,
+                callback=lambda indata, outdata, frames, time, status:
+                    self._processing_callback(indata, outdata, frames, time, status, token)
             )
-            self.stream.start()
-            logger.info("Audio stream (main output) started successfully.")
-
-            # If preview is enabled, open a second output stream to speakers
-            if self.preview_enabled and self.preview_device_id is not None:
-                self.preview_stream = sd.OutputStream(
-                    samplerate=self.sample_rate,
-                    device=self.preview_device_id,
-                    channels=2,
-                    dtype='float32',
-                    latency='low',
-                    callback=self._preview_callback
-                )
-                self.preview_stream.start()
-                logger.info("Preview audio stream to speakers started successfully.")
-            else:
-                self.preview_stream = None
+        else:
+            # Effects only: no mic capture, no duplex driver latency
+            stream = sd.OutputStream(
+                samplerate=self.sample_rate,
+                blocksize=self.blocksize,
+                device=self.output_device_id,
+                channels=2,
+                dtype='float32',
+                latency=self.latency,
+                callback=lambda outdata, frames, time, status:
+                    self._output_callback(outdata, frames, time, status, token)
+            )
+        return stream, token
+
+    def _open_output(self, name, device):
+        """
+        Opens (but does not start) a secondary output stream. The mixer writes this output's mix
+        (see audio_routing) into a ring of its own, which the stream's callback plays.
+        """
+        ring = OutputRing(self.sample_rate)
+        rt_events.register_source(name)
+        stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            device=device,
+            channels=2,
+            dtype='float32',
+            latency=self.latency,
+            callback=lambda outdata, frames, time, status: self._ring_callback(name, ring, outdata, status)
+        )
+        self._output_rings = {**self._output_rings, name: ring}
+        return stream
+
+    def _close_output(self, name, stream):
+        stream.stop()
+        stream.close()
+        rings = dict(self._output_rings)
+        rings.pop(name, None)
+        self._output_rings = rings
 
+    def _open_preview_stream(self):
+        return self._open_output('preview', self.preview_device_id)
+
+    def _open_extra_outputs(self):
+        """Opens the outputs listed in "extra_outputs" (name -> device); one failing does not stop the others."""
+        for name, device_name in (self.settings.get("extra_outputs") or {}).items():
+            try:
+                stream = self._open_output(name, self.resolve_device(device_name, 'output'))
+                stream.start()
+                self.extra_streams[name] = stream
+                logger.info(f"Output '{name}' started on {device_name}.")
+            except Exception as e:
+                logger.error(f"Could not open output '{name}' on {device_name}: {e}")
+
+    def _swap_main_stream(self, kind):
+        """Starts a new main stream before closing the old one, so there is no audible gap."""
+        old_stream = self.stream
+        new_stream, token = self._open_main_stream(kind)
+        try:
+            new_stream.start()
+        except Exception:
+            new_stream.close()
+            raise
+        # From here on only the new stream's callback mixes; the old one outputs silence until closed
+        self.stream, self.stream_kind, self._stream_token = new_stream, kind, token
+        old_stream.stop()
+        old_stream.close()
+
+    def reconfigure_streams(self, blocksize, latency):
+        """Reopens the running streams with a new block size and latency. Returns False if that failed."""
+        with self._reconfigure_lock:
+            return self._reconfigure_streams(blocksize, latency)
+
+    def _reconfigure_streams(self, blocksize, latency):
+        if not self.is_running or self.stream is None:
+            return False
+        previous = (self.blocksize, self.latency)
+        self.blocksize, self.latency = blocksize, latency
+        try:
+            self._swap_main_stream(self.stream_kind)
         except Exception as e:
-            logger.error(f"CRITICAL ERROR starting audio streams: {e}", exc_info=True)
-            self.is_running = False
+            self.blocksize, self.latency = previous
+            logger.error(f"Could not reopen main stream with blocksize={blocksize}, latency={latency}: {e}")
             return False
+        if self.preview_stream is not None:
+            self.preview_stream = self._reopen_output('preview', self.preview_stream, self.preview_device_id)
+        for name, stream in list(self.extra_streams.items()):
+            self.extra_streams[name] = self._reopen_output(name, stream, stream.device)
         return True
 
-    def stop_audio_processing(self):
-        if not self.is_running:
-            return
+    def _reopen_output(self, name, old_stream, device):
+        """Replaces a secondary output with one using the current buffer settings, or keeps the old one."""
+        old_ring = self._output_rings.get(name)
+        try:
+            stream = self._open_output(name, device)
+            stream.start()
+        except Exception as e:
+            logger.error(f"Could not reopen output '{name}', keeping the current one: {e}")
+            if old_ring is not None:
+                self._output_rings = {**self._output_rings, name: old_ring}
+            return old_stream
+        old_stream.stop()
+        old_stream.close()
+        return stream
 
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
-        if hasattr(self, 'preview_stream') and self.preview_stream:
-            self.preview_stream.stop()
-            self.preview_stream.close()
-            self.preview_stream = None
-        self.is_running = False
-        self.stop_all_sounds()
-        logger.info("All audio streams stopped.")
+    # --- sample rate negotiation ---
+    def _stream_devices(self):
+        """(kind, PortAudio index) of every running stream's device, main output first."""
+        devices = [('output', self.output_device_id)]
+        if self._needs_mic(self.mode):
+            devices.append(('input', self.mic_device_id))
+        if self.preview_stream is not None:
+            devices.append(('output', self.preview_device_id))
+        devices.extend(('output', stream.device) for stream in self.extra_streams.values())
+        return devices
+
+    def negotiate_sample_rate(self, cancel=None):
+        """
+        Moves the engine to the sample rate the devices run at natively, so neither the host API
+        nor the asset loading has to convert. Runs in the background after start: the loaded tone
+        banks and cached effects are rendered at the new rate first, then swapped in together with
+        reopened streams. Setting cancel (stopping audio does) abandons the switch. Returns the rate
+        in use afterwards.
+        """
+        devices = self._stream_devices()
+        rate = common_sample_rate([self.devices.native_rate(index) for _, index in devices], self.sample_rate)
+        if rate == self.sample_rate:
+            return rate
+        try:
+            for kind, index in devices:
+                check = sd.check_input_settings if kind == 'input' else sd.check_output_settings
+                check(device=index, samplerate=rate, channels=1 if kind == 'input' else 2, dtype='float32')
+        except Exception as e:
+            logger.info(f"Keeping {self.sample_rate} Hz; the devices do not all accept {rate} Hz: {e}")
+            return self.sample_rate
+        if self.recorder is not None:
+            logger.info(f"Not switching to {rate} Hz while recording.")
+            return self.sample_rate
+        self.set_sample_rate(rate, cancel=cancel)
+        return self.sample_rate
 
+    def _render_assets(self, rate):
+        """Renders the current voice, the cached tone banks and the cached effects at rate."""
+        with self.lock:
+            bank_files = list(self._tone_banks)
+            effect_paths = list(self._effect_cache)
+        speak = self._load_speak_tone(sample_rate=rate)
+        banks = {f: self._load_speak_tone(f, sample_rate=rate) for f in bank_files}
+        effects = {}
+        for path in effect_paths:
+            try:
+                effects[path] = self._decode_effect(path, rate)
+            except Exception as e:
+                logger.warning(f"Could not re-render {path} at {rate} Hz, it will decode on next use: {e}")
+        return speak, banks, effects
+
+    def _install_assets(self, rate, assets):
+        speak, banks, effects = assets
+        with self.lock:
+            self.sample_rate = self.negotiated_rate = rate
+            self.speak_tone, self.variated_speak_tones = speak
+            self._tone_banks = banks
+            self._effect_cache = effects
+            self._last_tts = None
+        self.macros.clear()
+        self._post_processors()
+
+    def set_sample_rate(self, rate, switch_streams=True, cancel=None):
+        """Re-renders the loaded assets at rate and switches to it, then reopens the running streams."""
+        old_rate = self.sample_rate
+        started = time.perf_counter()
+        assets = self._render_assets(rate)
+        logger.info(f"Assets re-rendered for {rate} Hz in {time.perf_counter() - started:.2f}s.")
+        with self._reconfigure_lock:
+            if cancel is not None and cancel.is_set():
+                logger.info(f"Audio stopped while rendering for {rate} Hz; not switching.")
+                return False
+            if switch_streams and self.is_running:
+                old_assets = (self.speak_tone, self.variated_speak_tones), dict(self._tone_banks), dict(self._effect_cache)
+                # Voices already queued were rendered for the old rate
+                self._post('stop_all')
+                self._install_assets(rate, assets)
+                if not self._reconfigure_streams(self.blocksize, self.latency):
+                    logger.error(f"Could not reopen streams at {rate} Hz, staying at {old_rate} Hz.")
+                    self._install_assets(old_rate, old_assets)
+                    self.negotiated_rate = None
+                    return False
+            else:
+                self._install_assets(rate, assets)
+        logger.info(f"Sample rate switched from {old_rate} Hz to {rate} Hz.")
+        if self.rate_listener is not None:
+            self.rate_listener(rate)
+        return True
+
+    def set_mode(self, mode):
+        """
+        Switches between merged, pass-through and effects-only. While running, the main stream is
+        swapped between duplex and output-only when mic capture becomes (un)necessary.
+        The new stream is started before the old one is closed so there is no audible gap.
+        """
+        self.mode = mode
+        # Seen by play_samples/schedule_samples right away, not only once the mixer runs again
+        self.mute_effects = mode == "pass-through"
+        with self._reconfigure_lock:
+            if not self.is_running or self.stream is None:
+                return
+            kind = 'duplex' if self._needs_mic(mode) else 'output'
+            if kind == self.stream_kind:
+                return
+            try:
+                self._swap_main_stream(kind)
+            except Exception as e:
+                logger.error(f"Could not reopen main stream as {kind}, keeping the current one: {e}")
+                return
+        logger.info(f"Main stream reconfigured as {kind} for mode '{mode}'.")
 
     def _db_to_gain(self, db):
-        return 10 ** (db / 20.0)
+        return db_to_gain(db)
 
-    def _processing_callback(self, indata, outdata, frames, time, status):
+    def _processing_callback(self, indata, outdata, frames, time, status, token=None):
         if status:
-            logger.warning(status)
+            rt_events.record_status('main', status)
+        if token is not self._stream_token or not self._mix_lock.acquire(blocking=False):
+            outdata.fill(0)
+            return
+        try:
+            self._mix_block(indata, outdata, frames, time.outputBufferDacTime, time.outputBufferDacTime - time.currentTime)
+        finally:
+            self._mix_lock.release()
 
-        with self.lock:
-            if self.mode in "merged":
-                mic_data = np.tile(indata, (1, 2))
-                mic_gain = 0.7
-                mic_data *= mic_gain
-                self.mute_effects = False
-            elif self.mode == "pass-through":
-                mic_data = np.tile(indata, (1, 2))
-                mic_gain = 0.7
-                mic_data *= mic_gain
-                self.mute_effects = True
-            else:
-                mic_data = np.zeros((frames, 2), dtype='float32')
-                self.mute_effects = False
-
-            effects_data = np.zeros((frames, 2), dtype='float32')
-            remaining_effects = []
-            effects_gain = self._db_to_gain(self.effects_volume_db)
-
-            for effect in self.active_effects:
-                effect_data = effect['data']
-                pos = effect['pos']
-                chunk = effect_data[pos:pos + frames]
-                chunk_len = len(chunk)
-                if chunk_len < frames:
-                    pad = np.zeros((frames - chunk_len, 2), dtype='float32')
-                    chunk = np.vstack([chunk, pad])
-                effects_data[:frames] += chunk * effects_gain
-                effect['pos'] += chunk_len
-                if effect['pos'] < len(effect_data):
+    def _output_callback(self, outdata, frames, time, status, token=None):
+        if status:
+            rt_events.record_status('main', status)
+        if token is not self._stream_token or not self._mix_lock.acquire(blocking=False):
+            outdata.fill(0)
+            return
+        try:
+            self._mix_block(None, outdata, frames, time.outputBufferDacTime, time.outputBufferDacTime - time.currentTime)
+        finally:
+            self._mix_lock.release()
+
+    # --- control -> audio thread messages ---
+    def _post(self, op, *args):
+        """
+        Queues a change to state owned by the mixer. deque appends and pops are atomic, so control
+        threads never block the callback, which applies everything queued at the top of the next
+        block. Without a running main stream the command is applied right away.
+        """
+        if len(self._commands) >= COMMAND_QUEUE_SIZE:
+            logger.warning(f"Audio command queue full, dropped '{op}'.")
+            return False
+        self._commands.append((op, args))
+        if self.stream is None and self._mix_lock.acquire(blocking=False):
+            try:
+                self._drain_commands()
+            finally:
+                self._mix_lock.release()
+        return True
+
+    def _drain_commands(self):
+        commands = self._commands
+        for _ in range(COMMAND_QUEUE_SIZE):
+            if not commands:
+                break
+            op, args = commands.popleft()
+            if op == 'play':
+                self.active_effects.append(args[0])
+            elif op == 'schedule':
+                heapq.heappush(self._scheduled, args[0])
+            elif op == 'gain':
+                self._effects_gain = args[0]
+            elif op == 'dsp':
+                self.mic_processor, self.limiter = args
+            elif op == 'routing':
+                self.routing = args[0]
+            elif op == 'recorder':
+                self._mix_recorder, swapped = args
+                swapped.set()
+            elif op == 'stop_all':
+                dropped = self.active_effects
+                self.active_effects = []
+                for effect in dropped:
+                    if 'stream' in effect:
+                        effect['stream'].close()
+                if self.finished_voices is not None:
+                    self.finished_voices.extend(dropped)
+                    self.finished_voices.extend({'buffer': buffer} for _, _, buffer in self._scheduled)
+                self._scheduled = []
+
+    def _mix_block(self, indata, outdata, frames, dac_time=None, dac_delay=0.0):
+        started = perf_counter()
+        self._drain_commands()
+        block_start = self._sample_clock
+        self._sample_clock += frames
+        if dac_time:
+            self._clock_anchor = (dac_time, block_start)
+        # Start every scheduled voice that falls inside this block at its exact offset
+        block_end = block_start + frames
+        while self._scheduled and self._scheduled[0][0] < block_end:
+            start, _, buffer = heapq.heappop(self._scheduled)
+            self.active_effects.append({'buffer': buffer, 'pos': 0, 'offset': max(0, start - block_start)})
+
+        mic_data = None
+        self.mute_effects = self.mode == "pass-through"
+        if indata is not None and self._needs_mic(self.mode):
+            # (frames, 1) after gain and gate, or None while the gate is closed
+            mic_data = self.mic_processor.process(indata)
+
+        # Buses: every voice is mixed once, into effects or tts; outputs combine the buses below
+        effects_data = np.zeros((frames, 2), dtype='float32')
+        tts_data = None
+        if self._scratch.shape[0] < frames:
+            self._scratch = np.zeros((frames, 2), dtype=np.float32)
+        remaining_effects = []
+        effects_gain = self._effects_gain
+        # A voice reaches the DAC after the limiter's lookahead as well
+        output_delay = max(0.0, dac_delay) + self.limiter.latency_samples / self.sample_rate
+
+        for effect in self.active_effects:
+            if 'stream' in effect:
+                effect['stream'].mix_into(effects_data, effects_gain, self._scratch)
+                if not effect['stream'].finished:
                     remaining_effects.append(effect)
+                elif self.finished_voices is not None:
+                    self.finished_voices.append(effect)
+                continue
+            if 'trace' in effect:
+                tracer.first_output(effect.pop('trace'), output_delay)
+            bus = effects_data
+            if effect.get('bus') == 'tts':
+                if tts_data is None:
+                    tts_data = np.zeros((frames, 2), dtype='float32')
+                bus = tts_data
+            # Converts and upmixes only this block of the compact buffer
+            offset = effect.pop('offset', 0)
+            effect['pos'] += mix_into(bus[offset:], effect['buffer'], effect['pos'], effects_gain, self._scratch)
+            if effect['pos'] < buffer_frames(effect['buffer']):
+                remaining_effects.append(effect)
+            elif self.finished_voices is not None:
+                self.finished_voices.append(effect)
 
-            self.active_effects = remaining_effects
+        self.active_effects = remaining_effects
 
-            mixed_data = mic_data + effects_data
-            max_amp = np.max(np.abs(mixed_data))
-            if max_amp > 1.0:
-                mixed_data = mixed_data / max_amp
-            np.clip(mixed_data, -1.0, 1.0, out=outdata)
-        if self.preview_enabled and hasattr(self, 'preview_stream') and self.preview_stream:
-            with self.lock:
-                # Save the outdata frame for preview
-                self._last_output_block = outdata.copy()
-    
-    def _preview_callback(self, outdata, frames, time, status):
-    # Playback last output block to preview device
-        if status:
-            logger.warning(f"Preview stream status: {status}")
-        with self.lock:
-            if hasattr(self, '_last_output_block'):
-                data = self._last_output_block
-                # Make sure data shape matches expected frames/channels
-                if data.shape[0] == frames and data.shape[1] == 2:
-                    outdata[:] = data
-                else:
-                    outdata.fill(0)
+        routing = self.routing
+        self.limiter.process(routing.main.mixed(mic_data, effects_data, tts_data, frames), outdata)
+        recorder = self._mix_recorder
+        if recorder is not None:
+            recorder.write(outdata)
+        for name, ring in self._output_rings.items():
+            route = routing.route(name)
+            if route.follows_main:
+                ring.write(outdata)
             else:
-                outdata.fill(0)
+                ring.write(route.render(mic_data, effects_data, tts_data, frames))
+        load = (perf_counter() - started) * self.sample_rate / frames
+        if load > self.peak_callback_load:
+            self.peak_callback_load = load
+
+    def _ring_callback(self, name, ring, outdata, status):
+        # Plays the mix the main callback wrote for this output
+        if status:
+            rt_events.record_status(name, status)
+        ring.read_into(outdata)
 
     def update_preview_enabled(self, enabled):
         # To handle enabling/disabling preview after start
-        self.preview_enabled = enabled
-        if not enabled and self.preview_stream:
-            self.preview_stream.stop()
-            self.preview_stream.close()
-            self.preview_stream = None
-        elif enabled and not self.preview_stream and self.is_running:
-            try:
-                # reopen preview stream with stored preview_device_id
-                self.preview_stream = sd.OutputStream(
-                    samplerate=self.sample_rate,
-                    device=self.preview_device_id,
-                    channels=2,
-                    dtype='float32',
-                    latency='low',
-                    callback=self._preview_callback
-                )
-                self.preview_stream.start()
-                logger.info("Preview audio stream enabled.")
-            except Exception as e:
-                logger.error(f"Failed to enable preview audio stream: {e}")
+        with self._reconfigure_lock:
+            self.preview_enabled = enabled
+            if not enabled and self.preview_stream:
+                self._close_output('preview', self.preview_stream)
+                self.preview_stream = None
+            elif enabled and not self.preview_stream and self.is_running:
+                try:
+                    # reopen preview stream with stored preview_device_id
+                    self.preview_stream = self._open_preview_stream()
+                    self.preview_stream.start()
+                    logger.info("Preview audio stream enabled.")
+                except Exception as e:
+                    logger.error(f"Failed to enable preview audio stream: {e}")
 
     def set_preview_device_id(self, device_id):
-        self.preview_device_id = device_id
-        if self.preview_enabled:
-            self.update_preview_enabled(False)  # disable first if running
-            self.update_preview_enabled(True)   # re-enable with new device
+        with self._reconfigure_lock:
+            self.preview_device_id = device_id
+            if self.preview_enabled:
+                self.update_preview_enabled(False)  # disable first if running
+                self.update_preview_enabled(True)   # re-enable with new device
+
+    def set_effects_gain(self, db_level):
+        """Sets the mixer's effects gain only; set_effects_volume also re-levels what is cached."""
+        self.effects_volume_db = float(db_level)
+        self._post('gain', db_to_gain(self.effects_volume_db))
 
     def set_effects_volume(self, db_level):
+        self.set_effects_gain(db_level)
+        logger.info(f"Effects volume set to {self.effects_volume_db} dB")
+        self.relevel_effects()
+
+    def relevel_effects(self):
+        """Re-levels the tone banks and drops cached effects for the current effects volume."""
+        # Slow; it only holds the control lock, never the mixer
+        bank = self._load_speak_tone()
         with self.lock:
-            self.effects_volume_db = float(db_level)
-            logger.info(f"Effects volume set to {self.effects_volume_db} dB")
-            self.speak_tone, self.variated_speak_tones = self._load_speak_tone()
+            self.speak_tone, self.variated_speak_tones = bank
+            self._tone_banks = {}
+            self._effect_cache = {}  # levelled for the old volume
 
     def stop_all_sounds(self):
-        with self.lock:
-            self.active_effects.clear()
+        self._post('stop_all')
         logger.info("All sound effects stopped.")
 
-    def play_sound_effect(self, sound_file):
+    def start_recording(self, path=None):
+        """
+        Starts recording everything sent to the main output. Without a path, a timestamped file
+        is created in the recordings folder in the configured format. Returns the file path.
+        """
+        with self.lock:
+            if self.recorder is not None:
+                return self.recorder.path
+            path = path or self.new_recording_path()
+            self.recorder = OutputRecorder(path, self.sample_rate,
+                                           ring_seconds=self.settings.get("recording_ring_seconds") or 8.0)
+            recorder = self.recorder
+        if not self._post('recorder', recorder, threading.Event()):
+            with self.lock:
+                self.recorder = None
+            recorder.close()
+            raise RuntimeError("audio command queue is full")
+        logger.info(f"Recording output to {path}")
+        return path
+
+    def new_recording_path(self):
+        folder = self.settings.get("recordings_path") or "recordings"
+        ext = self.settings.get("recording_format") or "wav"
+        return os.path.join(folder, time.strftime(f"session_%Y%m%d_%H%M%S.{ext}"))
+
+    def stop_recording(self):
+        """Stops the current recording and returns its stats, or None if nothing was recording."""
+        with self.lock:
+            recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        # Close only once the mixer has let go of it, so no block written after the final flush is lost
+        swapped = threading.Event()
+        if not self._post('recorder', None, swapped) or not swapped.wait(timeout=2):
+            logger.warning(f"Mixer did not release the recorder for {recorder.path}; closing it anyway.")
+        recorder.close()
+        return {'path': recorder.path, 'seconds': round(recorder.seconds, 2),
+                'dropped_blocks': recorder.dropped_blocks, 'error': recorder.error}
+
+    def get_stats(self):
+        # Plain reads of mixer-owned lists; they are replaced, never locked
+        active_voices = len(self.active_effects)
+        scheduled_voices = len(self._scheduled)
+        stats = {
+            'running': self.is_running,
+            'mode': self.mode,
+            'active_voices': active_voices,
+            'scheduled_voices': scheduled_voices,
+            'effects_volume_db': self.effects_volume_db,
+            'sample_rate': self.sample_rate,
+            'preview_enabled': self.preview_enabled,
+            'mic_level_db': round(self.mic_processor.level_db, 1),
+            'mic_gate_gain': round(self.mic_processor.gate_gain, 3),
+            'limiter_gain_reduction_db': round(self.limiter.gain_reduction_db, 2),
+            'stream_events': rt_events.totals(),
+            'latency': tracer.report(),
+            'memory_bytes': self.memory.usage(),
+            'stream_buffer': {'blocksize': self.blocksize, 'latency': self.latency},
+            'outputs': {name: ring.stats() for name, ring in self._output_rings.items()},
+        }
+        if self.tuner.pair_key and self.settings.get("latency_autotune"):
+            stats['latency_tuning'] = self.tuner.stats()
+        recorder = self.recorder
+        if recorder is not None:
+            stats['recording'] = {'path': recorder.path, 'seconds': round(recorder.seconds, 1),
+                                  'dropped_blocks': recorder.dropped_blocks}
+        stream = self.stream
+        if stream is not None:
+            stats['cpu_load'] = stream.cpu_load
+        return stats
+
+    def play_samples(self, buffer, trace=None, bus='effects'):
+        """
+        Queues an already decoded sample buffer (see sample_store) for playback on the 'effects'
+        or 'tts' bus. A latency trace passed along is stamped when the voice first reaches an output block.
+        """
+        if self.mute_effects or buffer_frames(buffer) == 0:
+            return False
+        voice = {'buffer': buffer, 'pos': 0}
+        if bus != 'effects':
+            voice['bus'] = bus
+        if trace is not None:
+            trace.mark("queue")
+            voice['trace'] = trace
+        return self._post('play', voice)
+
+    def stream_time(self):
+        """Current time of the main stream in seconds (same clock as stream.time), or None."""
+        stream = self.stream
+        return stream.time if stream is not None else None
+
+    def sample_time_for(self, at_time):
+        """
+        Converts a main stream time (seconds) into a position on the mixer's sample clock using the
+        DAC time the last callback reported for its first frame. Before the first block the clock
+        is assumed to continue from now. The limiter delays everything by its lookahead, so the
+        position is moved earlier by as much to be heard at at_time.
+        """
+        anchor = self._clock_anchor
+        if anchor is None:
+            now = self.stream_time()
+            anchor = (now if now is not None else at_time, self._sample_clock)
+        dac_time, sample = anchor
+        limiter = self.limiter
+        latency = limiter.latency_samples if limiter is not None else 0
+        return sample + int(round((at_time - dac_time) * self.sample_rate)) - latency
+
+    def schedule_samples(self, buffer, at_time=None, delay_samples=None):
+        """
+        Queues a sample buffer to start at an exact output sample instead of whenever the next block
+        picks it up. Pass either at_time, an absolute main stream time in seconds (see stream_time),
+        or delay_samples, counted from the start of the next block to be mixed. Times that are
+        already past start at the top of the next block. Returns the start position on the sample
+        clock, or None if nothing was queued.
+        """
+        if self.mute_effects or buffer_frames(buffer) == 0:
+            return None
+        if at_time is not None:
+            start = self.sample_time_for(at_time)
+        else:
+            start = self._sample_clock + max(0, int(delay_samples or 0))
+        if not self._post('schedule', (start, next(self._schedule_seq), buffer)):
+            return None
+        return start
+
+    def schedule_sequence(self, events, at_time=None):
+        """
+        Schedules [(offset_seconds, buffer), ...] relative to a common start (at_time, or the next
+        block), so the whole sequence keeps sample-exact spacing regardless of when it is queued.
+        """
+        if self.mute_effects:
+            return None
+        if at_time is not None:
+            base = self.sample_time_for(at_time)
+        else:
+            base = self._sample_clock
+        for offset, buffer in events:
+            if buffer_frames(buffer) == 0:
+                continue
+            start = base + int(round(offset * self.sample_rate))
+            self._post('schedule', (start, next(self._schedule_seq), buffer))
+        return base
+
+    def load_sound_effect(self, sound_file):
+        """Decodes an effect, or returns it from the effect cache if the file has not changed."""
+        path = self._resolve_sound_path(sound_file)
+        key = (os.path.getmtime(path), self.sample_rate, self.effects_volume_db, self.store_dtype)
+        with self.lock:
+            cached = self._effect_cache.pop(path, None)
+            if cached is not None and cached[0] == key:
+                self._effect_cache[path] = cached  # most recently used goes last
+                return cached[1]
+        key, buffer = self._decode_effect(path, self.sample_rate)
+        with self.lock:
+            self._effect_cache[path] = (key, buffer)
+        self.memory.enforce()
+        return buffer
+
+    def _decode_effect(self, path, sample_rate):
+        """Returns (cache key, buffer) for an effect file decoded at sample_rate."""
+        key = (os.path.getmtime(path), sample_rate, self.effects_volume_db, self.store_dtype)
+        return key, from_decoded(decode(path, sample_rate), self.effects_volume_db, self.store_dtype)
+
+    def _resolve_sound_path(self, sound_file):
+        return sound_file if os.path.exists(sound_file) else os.path.join(self.sound_effects_path, sound_file)
+
+    def play_stream(self, sound_file, loop=False, start_seconds=0.0):
+        """
+        Plays a long file through a StreamingSource instead of decoding it up front.
+        It is levelled to the effects volume from its first second. Returns the source,
+        which can be used to seek() or close() it, or None if effects are muted.
+        """
+        if self.mute_effects:
+            return None
+        source = StreamingSource(self._resolve_sound_path(sound_file), self.sample_rate, loop=loop,
+                                 start_seconds=start_seconds, ring_seconds=self.streaming_ring_seconds,
+                                 volume_db=self.effects_volume_db)
+        # Give the decoder a head start so the first blocks are not silent
+        source.wait_ready()
+        if not self._post('play', {'stream': source}):
+            source.close()
+            return None
+        logger.info(f"Streaming {sound_file} (loop={loop}).")
+        return source
+
+    def play_sound_effect(self, sound_file, trace=None, bus='effects'):
         if not self.mute_effects:
             try:
-                path_to_sound = sound_file if os.path.exists(sound_file) else os.path.join(self.sound_effects_path, sound_file)
-                sound = AudioSegment.from_file(path_to_sound)
-                target_volume_db = self.effects_volume_db
-                gain_change = target_volume_db - sound.dBFS
-                sound = sound.apply_gain(gain_change)
-                if sound.channels == 1:
-                    sound = sound.set_channels(2)
-                sound = sound.set_frame_rate(self.sample_rate)
-                sample_width = sound.sample_width
-                max_val = float(2 ** (8 * sample_width - 1))
-                samples = np.array(sound.get_array_of_samples()).astype(np.float32) / max_val
-                samples = samples.reshape((-1, 2))
-                with self.lock:
-                    self.active_effects.append({'data': samples, 'pos': 0})
+                if should_stream(self._resolve_sound_path(sound_file), self.streaming_min_seconds):
+                    self.play_stream(sound_file)
+                else:
+                    samples = self.load_sound_effect(sound_file)
+                    if trace is not None:
+                        trace.mark("decode")
+                    self.play_samples(samples, trace, bus)
             except Exception as e:
                 logger.error(f"Error playing sound effect {sound_file}: {e}")
 
-    def _load_speak_tone(self):
+    def play_macro(self, name, trace=None):
+        """Plays a configured macro (see macro_timeline) as a single voice, rendering it if needed."""
+        if self.mute_effects:
+            return False
+        try:
+            buffer = self.macros.render(name)
+            if trace is not None:
+                trace.mark("render")
+            return self.play_samples(buffer, trace)
+        except Exception as e:
+            logger.error(f"Error playing macro {name}: {e}")
+            return False
+
+    def find_speaktone_file(self, character):
+        return find_speaktone_file(self.sound_effects_path, character)
+
+    def get_tone_bank(self, speaktone_file):
+        """Returns (speak_tone, variated_speak_tones) for any character, loading it once."""
+        with self.lock:
+            bank = self._tone_banks.pop(speaktone_file, None)
+            if bank is not None:
+                self._tone_banks[speaktone_file] = bank  # most recently used goes last
+        if bank is None:
+            bank = self._load_speak_tone(speaktone_file)
+            with self.lock:
+                self._tone_banks[speaktone_file] = bank
+            self.memory.enforce()
+        return bank
+
+    def generate_tts_samples(self, text, speaktone_file=None):
+        """
+        Renders text straight to a sample buffer, without going through the temp file.
+        Uses the configured character unless speaktone_file is given.
+        """
+        if speaktone_file:
+            speak_tone, vtones = self.get_tone_bank(speaktone_file)
+        else:
+            with self.lock:
+                speak_tone, vtones = self.speak_tone, self.variated_speak_tones
+        return render_tts(speak_tone, vtones, text, self.sample_rate, self.tts_pause_ms, self.effects_volume_db,
+                          store_dtype=self.store_dtype)
+
+    def _load_speak_tone(self, selected_speaktone=None, sample_rate=None):
         """
-        Loads the selected SpeakTone or VSpeakTone set from config.
+        Loads the selected SpeakTone or VSpeakTone set from config (or the given file).
         Returns:
             - speak_tone: dict for normal SpeakTone or None if using variated
-            - variated_speak_tones: list of dicts if using VSpeakTone, else []
+            - variated_speak_tones: list of dicts if using VSpeakTone or pitch/speed variation, else []
         """
-        try:
-            if not os.path.exists(self.sound_effects_path):
-                os.makedirs(self.sound_effects_path)
+        if selected_speaktone is None:
             selected_speaktone = self.settings.get("speaktone_file")
-            speak_tone_path = None
-            variated_tones = []
-
-            import re
-            # Check for VSpeakTone selection (e.g. tenna--VSpeakTone1.ogg)
-            vspeak_match = re.match(r"^(.*)--VSpeakTone\d+\.(ogg|wav|mp3)$", selected_speaktone or "", re.IGNORECASE)
-            if vspeak_match:
-                base = vspeak_match.group(1)
-                # Load all matching VSpeakTone files for this base
-                vtones = []
-                for f in os.listdir(self.sound_effects_path):
-                    if re.match(rf"^{re.escape(base)}--VSpeakTone\d+\.(ogg|wav|mp3)$", f, re.IGNORECASE):
-                        vtones.append(os.path.join(self.sound_effects_path, f))
-                vtones.sort()
-                for vtone_path in vtones:
-                    ext = os.path.splitext(vtone_path)[1].lower()
-                    if ext == ".ogg":
-                        sound = AudioSegment.from_ogg(vtone_path)
-                    elif ext == ".wav":
-                        sound = AudioSegment.from_wav(vtone_path)
-                    elif ext == ".mp3":
-                        sound = AudioSegment.from_mp3(vtone_path)
-                    else:
-                        sound = AudioSegment.from_file(vtone_path)
-                    gain_change = self.effects_volume_db - sound.dBFS
-                    sound = sound.apply_gain(gain_change)
-                    if sound.channels == 1:
-                        sound = sound.set_channels(2)
-                    sound = sound.set_frame_rate(self.sample_rate)
-                    sample_width = sound.sample_width
-                    max_val = float(2 ** (8 * sample_width - 1))
-                    samples = np.array(sound.get_array_of_samples()).astype(np.float32) / max_val
-                    samples = samples.reshape((-1, 2))
-                    variated_tones.append({
-                        'audio_segment': sound,
-                        'data': samples,
-                        'pos': 0
-                    })
-                if not variated_tones:
-                    logger.warning("No VSpeakTone files found. Using silence.")
-                    silent_seg = AudioSegment.silent(duration=1000, frame_rate=self.sample_rate).set_channels(2)
-                    return None, [{
-                        'audio_segment': silent_seg,
-                        'data': np.zeros((self.sample_rate, 2), dtype=np.float32),
-                        'pos': 0
-                    }]
-                return None, variated_tones
-
-            # Otherwise, use normal SpeakTone
-            if selected_speaktone:
-                candidate = os.path.join(self.sound_effects_path, selected_speaktone)
-                if os.path.exists(candidate):
-                    speak_tone_path = candidate
-            if not speak_tone_path:
-                # Fallback: first available -SpeakTone file (any extension, not variated)
-                speak_pattern = re.compile(r"^(.*)-SpeakTone\.(ogg|wav|mp3)$", re.IGNORECASE)
-                speak_tone_path = next(
-                    (os.path.join(self.sound_effects_path, f)
-                     for f in os.listdir(self.sound_effects_path)
-                     if speak_pattern.match(f)),
-                    None)
-            if not speak_tone_path:
-                logger.warning("No speak tone file found. Using silence.")
-                silent_seg = AudioSegment.silent(duration=1000, frame_rate=self.sample_rate).set_channels(2)
-                return {
-                    'audio_segment': silent_seg,
-                    'data': np.zeros((self.sample_rate, 2), dtype=np.float32),
-                    'pos': 0
-                }, []
-            ext = os.path.splitext(speak_tone_path)[1].lower()
-            if ext == ".ogg":
-                sound = AudioSegment.from_ogg(speak_tone_path)
-            elif ext == ".wav":
-                sound = AudioSegment.from_wav(speak_tone_path)
-            elif ext == ".mp3":
-                sound = AudioSegment.from_mp3(speak_tone_path)
-            else:
-                sound = AudioSegment.from_file(speak_tone_path)
-            gain_change = self.effects_volume_db - sound.dBFS
-            sound = sound.apply_gain(gain_change)
-            if sound.channels == 1:
-                sound = sound.set_channels(2)
-            sound = sound.set_frame_rate(self.sample_rate)
-            sample_width = sound.sample_width
-            max_val = float(2 ** (8 * sample_width - 1))
-            samples = np.array(sound.get_array_of_samples()).astype(np.float32) / max_val
-            samples = samples.reshape((-1, 2))
-            return {
-                'audio_segment': sound,
-                'data': samples,
-                'pos': 0
-            }, []
-
-        except Exception as e:
-            logger.error(f"Error loading speak tone: {e}")
-            silent_seg = AudioSegment.silent(duration=1000, frame_rate=self.sample_rate).set_channels(2)
-            return {
-                'audio_segment': silent_seg,
-                'data': np.zeros((self.sample_rate, 2), dtype=np.float32),
-                'pos': 0
-            }, []
-
-        except Exception as e:
-            logger.error(f"Error loading speak tone: {e}")
-            silent_seg = AudioSegment.silent(duration=1000, frame_rate=self.sample_rate).set_channels(2)
-            return {
-                'audio_segment': silent_seg,
-                'data': np.zeros((self.sample_rate, 2), dtype=np.float32),
-                'pos': 0
-            }, []
+        return load_tone_bank(self.sound_effects_path, selected_speaktone, sample_rate or self.sample_rate,
+                              self.effects_volume_db, self.store_dtype, voice_variation(self.settings, selected_speaktone))
 
     def generate_tts_audio(self, text):
-        # If using variated speak tones, randomly select for each character, avoiding repeats
-        if (self.variated_speak_tones is not None) and len(self.variated_speak_tones) > 0:
-            try:
-                with self.lock:
-                    pause_duration = self.tts_pause_ms
-                    vtones = self.variated_speak_tones
-                combined = AudioSegment.empty()
-                silent_pause = AudioSegment.silent(duration=pause_duration, frame_rate=self.sample_rate)
-                last_idx = None
-                for char in text:
-                    if char == ' ':
-                        combined += silent_pause
-                    else:
-                        # Pick a random index, reroll if same as last
-                        if len(vtones) == 1:
-                            idx = 0
-                        else:
-                            idx = random.randint(0, len(vtones) - 1)
-                            while idx == last_idx and len(vtones) > 1:
-                                idx = random.randint(0, len(vtones) - 1)
-                        combined += vtones[idx]['audio_segment']
-                        last_idx = idx
-                combined = combined.set_channels(2).set_frame_rate(self.sample_rate)
-                combined.export(self.temp_tts_filename, format="ogg")
-                logger.info(f"TTS audio (variated) generated and saved to {self.temp_tts_filename}")
-                return True
-            except Exception as e:
-                logger.error(f"Error generating TTS audio (variated): {e}")
-                return False
-
-        # Otherwise, use normal speak tone
-        if not self.speak_tone or 'audio_segment' not in self.speak_tone:
-            logger.warning("No speak tone audio segment loaded for TTS.")
-            return False
+        """Renders text with the configured character and saves it to the temp TTS file."""
         try:
-            with self.lock:
-                pause_duration = self.tts_pause_ms
-                speak_tone_seg = self.speak_tone['audio_segment']
-            combined = AudioSegment.empty()
-            silent_pause = AudioSegment.silent(duration=pause_duration, frame_rate=self.sample_rate)
-            for char in text:
-                if char == ' ':
-                    combined += silent_pause
-                else:
-                    combined += speak_tone_seg
-            combined = combined.set_channels(2).set_frame_rate(self.sample_rate)
-            combined.export(self.temp_tts_filename, format="ogg")
+            buffer = self.generate_tts_samples(text)
+            if buffer is None:
+                return False
+            pcm = np.rint(to_float(buffer) * 32767).clip(-32768, 32767).astype(np.int16)
+            write_audio(self.temp_tts_filename, pcm, self.sample_rate)
+            # Kept so play_generated_tts does not have to decode the file it just wrote
+            self._last_tts = (self.temp_tts_filename, os.path.getmtime(self.temp_tts_filename), buffer)
             logger.info(f"TTS audio generated and saved to {self.temp_tts_filename}")
             return True
         except Exception as e:
             logger.error(f"Error generating TTS audio: {e}")
             return False
 
-    def play_generated_tts(self):
+    def play_generated_tts(self, trace=None):
         if (not self.mute_effects) and (os.path.exists(self.temp_tts_filename)):
-            self.play_sound_effect(self.temp_tts_filename)
+            last = self._last_tts
+            if last and last[0] == self.temp_tts_filename and last[1] == os.path.getmtime(self.temp_tts_filename):
+                self.play_samples(last[2], trace, bus='tts')
+            else:
+                self.play_sound_effect(self.temp_tts_filename, trace, bus='tts')
             logger.info(f"TTS audio played from {self.temp_tts_filename}")
\ No newline at end of file
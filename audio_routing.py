@@ -0,0 +1,146 @@
+import numpy as np
+from audio_dsp import PeakLimiter, db_to_gain
+
+# Routing from the mixer's buses to the output streams. The mixer sums every voice into its
+# bus once per block; each output then takes its own weighted sum of the buses. The main
+# output (the virtual cable) is mixed in the main stream's callback; every other output
+# (preview speakers, "extra_outputs") gets its block through an OutputRing that its own
+# stream's callback reads. Outputs whose sends match the main output's just reuse its block.
+# Sends come from the "routing" config key, output name -> {bus: gain in dB, or null for off}:
+#     "routing": {"main": {"mic": 0, "effects": 0, "tts": 0}, "headphones": {"effects": 0, "tts": -6}}
+# A bus missing from an output's sends is off; an output missing from "routing" follows main.
+
+BUSES = ("mic", "effects", "tts")
+DEFAULT_SENDS = {"mic": 0.0, "effects": 0.0, "tts": 0.0}
+MAIN = "main"
+
+
+def send_gains(sends):
+    """(mic, effects, tts) linear gains from a {bus: dB or None} mapping."""
+    return tuple(0.0 if sends.get(bus) is None else db_to_gain(float(sends[bus])) for bus in BUSES)
+
+
+class Route:
+    __slots__ = ("name", "gains", "limiter", "follows_main", "_mix", "_out")
+
+    def __init__(self, name, gains, limiter=None, follows_main=False):
+        self.name = name
+        self.gains = gains
+        self.limiter = limiter
+        self.follows_main = follows_main
+        self._mix = np.zeros((0, 2), dtype=np.float32)
+        self._out = np.zeros((0, 2), dtype=np.float32)
+
+    def mix(self, mic, effects, tts, out):
+        """Sums the buses with this route's gains into out. mic is (frames, 1) or None, tts may be None."""
+        g_mic, g_effects, g_tts = self.gains
+        np.multiply(effects, g_effects, out=out)
+        if tts is not None and g_tts:
+            out += tts * np.float32(g_tts)
+        if mic is not None and g_mic:
+            out += mic * np.float32(g_mic)  # mono mic broadcasts to both channels
+        return out
+
+    def mixed(self, mic, effects, tts, frames):
+        """Mixes into a block owned by the route (reused across callbacks), before limiting."""
+        if self._mix.shape[0] != frames:
+            self._mix = np.zeros((frames, 2), dtype=np.float32)
+            self._out = np.zeros((frames, 2), dtype=np.float32)
+        return self.mix(mic, effects, tts, self._mix)
+
+    def render(self, mic, effects, tts, frames):
+        """Mixes and limits with the route's own limiter."""
+        self.limiter.process(self.mixed(mic, effects, tts, frames), self._out)
+        return self._out
+
+
+class RoutingGraph:
+    """Immutable set of routes; a new graph is built on config reload and posted to the mixer."""
+
+    def __init__(self, routing, limiter_settings):
+        routing = routing or {}
+        main_sends = dict(DEFAULT_SENDS)
+        main_sends.update(routing.get(MAIN) or {})
+        self.main = Route(MAIN, send_gains(main_sends))
+        self._follow_main = Route(None, self.main.gains, follows_main=True)
+        self.routes = {}
+        for name, sends in routing.items():
+            if name == MAIN:
+                continue
+            gains = send_gains(sends or {})
+            if gains == self.main.gains:
+                self.routes[name] = Route(name, gains, follows_main=True)
+            else:
+                self.routes[name] = Route(name, gains, PeakLimiter(*limiter_settings))
+
+    def route(self, name):
+        return self.routes.get(name, self._follow_main)
+
+
+class OutputRing:
+    """
+    Single-producer (mixer) / single-consumer (output callback) float32 ring, the same scheme as
+    OutputRecorder: each side only advances its own position. The reader starts once target
+    frames (at least one mixer block) are buffered, plays silence on underrun and then waits
+    for the ring to refill, and skips ahead if the devices' clocks drift and the ring grows.
+    """
+
+    def __init__(self, sample_rate, channels=2, seconds=0.5, target_seconds=0.02):
+        self._ring = np.zeros((int(seconds * sample_rate), channels), dtype=np.float32)
+        self._capacity = self._ring.shape[0]
+        self._target = int(target_seconds * sample_rate)
+        self._block = 0
+        self._write_pos = 0   # advanced by the mixer
+        self._read_pos = 0    # advanced by the output callback
+        self._primed = False
+        self.overruns = 0
+        self.underruns = 0
+        self.skipped_frames = 0
+
+    @property
+    def nbytes(self):
+        return self._ring.nbytes
+
+    # --- mixer side ---
+    def write(self, block):
+        n = block.shape[0]
+        self._block = n
+        if self._capacity - (self._write_pos - self._read_pos) < n:
+            self.overruns += 1
+            return
+        start = self._write_pos % self._capacity
+        first = min(n, self._capacity - start)
+        self._ring[start:start + first] = block[:first]
+        if first < n:
+            self._ring[:n - first] = block[first:]
+        self._write_pos += n
+
+    # --- output callback side ---
+    def read_into(self, outdata):
+        frames = outdata.shape[0]
+        target = max(self._target, self._block)
+        available = self._write_pos - self._read_pos
+        if not self._primed:
+            if available < max(target, frames):
+                outdata.fill(0)
+                return
+            self._primed = True
+        if available > 4 * target + frames:
+            skip = available - (target + frames)
+            self._read_pos += skip
+            self.skipped_frames += skip
+            available -= skip
+        n = min(frames, available)
+        start = self._read_pos % self._capacity
+        first = min(n, self._capacity - start)
+        outdata[:first] = self._ring[start:start + first]
+        if first < n:
+            outdata[first:n] = self._ring[:n - first]
+        self._read_pos += n
+        if n < frames:
+            outdata[n:].fill(0)
+            self.underruns += 1
+            self._primed = False
+
+    def stats(self):
+        return {'underruns': self.underruns, 'overruns': self.overruns, 'skipped_frames': self.skipped_frames}
@@ -0,0 +1,132 @@
+"""
+Headless batch TTS renderer.
+
+Renders one audio file per input line, in parallel across a process pool, without starting Qt
+or opening any audio device. Example:
+
+    python batch_tts.py script.txt -o rendered --character tenna --format ogg
+    type lines.txt | python batch_tts.py - -o rendered
+
+Files are named <line number>_<text slug>.<ext> and listed in manifest.json in input order.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from settings_manager import SettingsManager
+from tone_bank import find_speaktone_file, load_tone_bank, render_tts, voice_variation
+from sample_store import buffer_frames, to_float
+from audio_decoder import write_audio
+from logger_config import logger
+
+# Per-process state, filled once by _init_worker so each worker decodes the voice bank only once
+_worker = {}
+
+
+def _init_worker(tones_path, speaktone_file, sample_rate, pause_ms, volume_db, output_dir, fmt, seed, variation):
+    speak_tone, variated_speak_tones = load_tone_bank(tones_path, speaktone_file, sample_rate, volume_db,
+                                                      variation=variation)
+    _worker.update(
+        speak_tone=speak_tone,
+        variated_speak_tones=variated_speak_tones,
+        sample_rate=sample_rate,
+        pause_ms=pause_ms,
+        volume_db=volume_db,
+        output_dir=output_dir,
+        format=fmt,
+        seed=seed,
+    )
+
+
+def _slug(text, max_len=32):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_").lower()
+    return slug[:max_len] or "line"
+
+
+def _write_audio(path, samples, sample_rate):
+    # Rounded like generate_tts_audio; truncating toward zero would bias every sample
+    pcm = np.rint(samples * 32767).clip(-32768, 32767).astype(np.int16)
+    write_audio(path, pcm, sample_rate)
+
+
+def _render_line(job):
+    index, text = job
+    # Seeded per line so variated voices come out the same on every run, whatever the worker count
+    rng = random.Random(f"{_worker['seed']}:{index}")
+    buffer = render_tts(_worker['speak_tone'], _worker['variated_speak_tones'], text,
+                         _worker['sample_rate'], _worker['pause_ms'], _worker['volume_db'], rng=rng)
+    entry = {"index": index, "text": text, "file": None, "frames": 0, "duration_s": 0.0}
+    if buffer is None:
+        return entry
+    frames = buffer_frames(buffer)
+    filename = f"{index:05d}_{_slug(text)}.{_worker['format']}"
+    _write_audio(os.path.join(_worker['output_dir'], filename), to_float(buffer), _worker['sample_rate'])
+    entry.update(file=filename, frames=frames, duration_s=round(frames / _worker['sample_rate'], 3))
+    return entry
+
+
+def _read_phrases(source):
+    """(line number, phrase) for every non-blank line; files are named after the line number."""
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        return [(number, line.strip()) for number, line in enumerate(stream, start=1) if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main(argv=None):
+    settings = SettingsManager()
+    parser = argparse.ArgumentParser(description="Render TTS phrases to audio files in parallel.")
+    parser.add_argument("input", help="Text file with one phrase per line, or '-' for stdin")
+    parser.add_argument("-o", "--output-dir", default="tts_output")
+    parser.add_argument("-c", "--character", help="Character or SpeakTone file (default: configured speak tone)")
+    parser.add_argument("-f", "--format", choices=["wav", "ogg"], default="wav")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--sample-rate", type=int, default=settings.get("sample_rate"))
+    parser.add_argument("--seed", default="deltatoner", help="Seed for variated tone selection")
+    args = parser.parse_args(argv)
+
+    tones_path = settings.get("sound_effects_path")
+    speaktone_file = settings.get("speaktone_file")
+    if args.character:
+        speaktone_file = find_speaktone_file(tones_path, args.character)
+        if speaktone_file is None:
+            parser.error(f"unknown character '{args.character}'")
+
+    phrases = _read_phrases(args.input)
+    if not phrases:
+        parser.error("no phrases to render")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = max(1, min(args.jobs, len(phrases)))
+    # Several phrases per task keeps IPC overhead low on scripts with thousands of short lines
+    chunksize = max(1, len(phrases) // (jobs * 8))
+    init_args = (tones_path, speaktone_file, args.sample_rate, settings.get("tts_pause_ms"),
+                 settings.get("effects_volume_db"), args.output_dir, args.format, args.seed,
+                 voice_variation(settings, speaktone_file))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=init_args) as pool:
+        manifest = list(pool.map(_render_line, phrases, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    with open(os.path.join(args.output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "character": speaktone_file,
+            "sample_rate": args.sample_rate,
+            "format": args.format,
+            "lines": manifest,
+        }, f, indent=4)
+    logger.info(f"Batch TTS rendered {len(phrases)} phrases with {jobs} workers in {elapsed:.2f}s")
+    print(f"Rendered {len(phrases)} phrases with {jobs} workers in {elapsed:.2f}s -> {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
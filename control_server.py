@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logger_config import logger
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+class ControlServer:
+    """
+    Local control socket so other processes (bots, stream-deck scripts, chat integrations)
+    can drive DeltaToner. Speaks line-delimited JSON, one request per line:
+
+        {"id": 1, "cmd": "play", "file": "boom.ogg"}
+        {"id": 2, "cmd": "speak", "text": "hello", "character": "sans"}
+        {"id": 3, "cmd": "stop"}
+        {"id": 4, "cmd": "stats"}
+        {"id": 5, "cmd": "play", "file": "ambience.ogg", "stream": true, "loop": true}
+        {"id": 6, "cmd": "memory", "snapshot": true}
+
+    Every request gets one response line echoing its id: {"id": 1, "ok": true, ...}
+    or {"id": 1, "ok": false, "error": "..."}. Clients may pipeline requests; up to
+    max_in_flight run concurrently per connection and responses are sent as they complete.
+    Once that limit is hit the server stops reading from the client until a slot frees up.
+    """
+
+    def __init__(self, audio_manager, host="127.0.0.1", port=7313, socket_path=None,
+                 max_in_flight=16, workers=4):
+        self.audio_manager = audio_manager
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="control")
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self.clients = 0
+        self.requests_served = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self._thread.start()
+        self._started.wait(timeout=5)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Control server stopped.")
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._listen())
+        except Exception as e:
+            logger.error(f"Control server failed to start: {e}")
+            self._loop.close()
+            self._loop = None
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            pending = asyncio.all_tasks(self._loop)
+            for task in pending:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+            self._loop = None
+
+    async def _listen(self):
+        if self.socket_path and hasattr(asyncio, "start_unix_server"):
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self._server = await asyncio.start_unix_server(
+                self._handle_client, path=self.socket_path, limit=MAX_LINE_BYTES)
+            logger.info(f"Control server listening on {self.socket_path}")
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_client, host=self.host, port=self.port, limit=MAX_LINE_BYTES)
+            logger.info(f"Control server listening on {self.host}:{self.port}")
+
+    async def _handle_client(self, reader, writer):
+        self.clients += 1
+        slots = asyncio.Semaphore(self.max_in_flight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await slots.acquire()  # backpressure: stop reading while the client has too much in flight
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    slots.release()
+                    await self._send(writer, write_lock, {"ok": False, "error": "request too long"})
+                    break
+                if not line:
+                    slots.release()
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._serve(line, writer, write_lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def _serve(self, line, writer, write_lock, slots):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request_id = request.get("id")
+            result = await self._dispatch(request)
+            response = {"ok": True, **result}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        finally:
+            slots.release()
+        if request_id is not None:
+            response["id"] = request_id
+        self.requests_served += 1
+        await self._send(writer, write_lock, response)
+
+    async def _send(self, writer, write_lock, response):
+        async with write_lock:
+            writer.write(json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def _dispatch(self, request):
+        cmd = request.get("cmd")
+        # Everything that touches AudioManager runs on the executor so the event loop never waits on its lock
+        if cmd == "play":
+            sound_file = request.get("file")
+            if not sound_file:
+                raise ValueError("'file' is required")
+            if request.get("stream") or request.get("loop"):
+                source = await self._call(self.audio_manager.play_stream, sound_file, bool(request.get("loop")))
+                return {"queued": source is not None}
+            samples = await self._call(self.audio_manager.load_sound_effect, sound_file)
+            return {"queued": await self._call(self.audio_manager.play_samples, samples)}
+        if cmd == "speak":
+            text = request.get("text")
+            if not text:
+                raise ValueError("'text' is required")
+            speaktone_file = None
+            character = request.get("character")
+            if character:
+                speaktone_file = self.audio_manager.find_speaktone_file(character)
+                if speaktone_file is None:
+                    raise ValueError(f"unknown character '{character}'")
+            samples = await self._call(self.audio_manager.generate_tts_samples, text, speaktone_file)
+            return {"queued": await self._call(self.audio_manager.play_samples, samples, None, 'tts')}
+        if cmd == "stop":
+            await self._call(self.audio_manager.stop_all_sounds)
+            return {}
+        if cmd == "stats":
+            stats = await self._call(self.audio_manager.get_stats)
+            stats["control_clients"] = self.clients
+            stats["control_requests"] = self.requests_served
+            return {"stats": stats}
+        if cmd == "memory":
+            report = await self._call(self.audio_manager.memory.report, bool(request.get("snapshot")))
+            return {"memory": report}
+        raise ValueError(f"unknown command '{cmd}'")
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
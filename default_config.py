@@ -10,5 +10,40 @@ def get_default_config():
         "temp_tts_filename": "temp_tts_audio.wav",
         "tts_pause_ms": 100,
         "effects_volume_db": -12.0,
-        "sample_rate": 48000
+        "sample_rate": 48000,
+        "sample_store_dtype": "int16",  # "int16" or "float16" for decoded effects and tones
+        "streaming_min_seconds": 60.0,  # files this long are streamed instead of decoded up front
+        "streaming_ring_seconds": 4.0,
+        "mic_gain_db": -3.0,
+        "noise_gate_enabled": True,
+        "noise_gate_threshold_db": -50.0,
+        "noise_gate_attack_ms": 5.0,
+        "noise_gate_release_ms": 150.0,
+        "limiter_ceiling_db": -0.3,
+        "limiter_lookahead_ms": 1.5,
+        "limiter_release_ms": 80.0,
+        "perf_log_enabled": False,
+        "perf_log_interval_s": 5.0,
+        "control_server_enabled": False,
+        "control_server_host": "127.0.0.1",
+        "control_server_port": 7313,
+        "control_server_socket": "",  # Unix socket path, used instead of TCP when set
+        "engine_mode": "thread",  # "process" runs the streams and mixer in a separate process
+        "tts_pitch_variation_semitones": 0.0,  # random pitch per character, +- semitones
+        "tts_speed_variation": 0.0,  # random per-character length, e.g. 0.1 for +-10%
+        "tts_variant_count": 8,  # precomputed variants per tone when variation is on
+        "tts_voice_variation": {},  # per character overrides, e.g. {"sans": {"pitch_semitones": 0.5}}
+        "recordings_path": "recordings",
+        "recording_format": "wav",  # "wav" or "flac" (flac needs the soundfile package)
+        "recording_ring_seconds": 8.0,
+        "negotiate_sample_rate": True,  # switch to the devices' native rate after start instead of "sample_rate"
+        "latency_autotune": False,  # adapt stream buffer size to dropouts, per device pair
+        "stream_tuning": {},  # written by the latency tuner: device pair -> settled buffer step
+        "routing": {  # output -> bus sends in dB (null = off); see audio_routing
+            "main": {"mic": 0.0, "effects": 0.0, "tts": 0.0},
+            "preview": {"mic": 0.0, "effects": 0.0, "tts": 0.0},
+        },
+        "extra_outputs": {},  # name -> output device, e.g. {"headphones": "Headphones (USB Audio), Windows WASAPI"}
+        "memory_limits_mb": {"effect_cache": 256, "macro_cache": 128, "tone_banks": 128, "total": 0},  # 0 = no limit
+        "macros": {}  # name -> list of {"effect": file} / {"tts": text, "character": name} / {"gap_ms": n}
     }
\ No newline at end of file
@@ -0,0 +1,117 @@
+import threading
+from collections import Counter
+import sounddevice as sd
+from logger_config import logger
+
+
+def common_sample_rate(rates, preferred):
+    """
+    Picks the rate the most devices run at natively, so the host API converts as few streams as
+    possible. rates are the devices' native rates, most important first (the main output); ties go
+    to preferred, then to the more important device.
+    """
+    counts = Counter(rate for rate in rates if rate)
+    if not counts:
+        return preferred
+    best = max(counts.values())
+    if counts.get(preferred) == best:
+        return preferred
+    return next(rate for rate in rates if counts.get(rate) == best)
+
+
+class DeviceRegistry:
+    """
+    Cached view of the PortAudio devices. Enumeration runs once and is reused by the device
+    menus, the settings dialog and stream start. Devices are indexed by the same
+    "name, hostapi" key shown in the menus, which stays stable while PortAudio indices can
+    shift between sessions. The cache is only refreshed by rescan(), either explicitly or
+    when a lookup misses or a stream fails to open (a device was plugged in or removed).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = None
+        self._by_key = {}
+
+    def _enumerate(self):
+        devices = []
+        hostapis = sd.query_hostapis()
+        for device in sd.query_devices():
+            try:
+                hostapi_name = hostapis[device['hostapi']]['name']
+                devices.append({
+                    'key': f"{device['name']}, {hostapi_name}",
+                    'index': device['index'],
+                    'name': device['name'],
+                    'hostapi': hostapi_name,
+                    'max_input_channels': device['max_input_channels'],
+                    'max_output_channels': device['max_output_channels'],
+                    'default_samplerate': device['default_samplerate'],
+                })
+            except Exception as e:
+                logger.error(f"Could not query device '{device.get('name', 'Unknown')}': {e}")
+        return devices
+
+    def _ensure(self):
+        if self._devices is None:
+            self._devices = self._enumerate()
+            self._by_key = {}
+            for device in self._devices:
+                # Keep the first entry if two endpoints share a name on the same host API
+                self._by_key.setdefault(device['key'], device)
+            logger.info(f"Device registry loaded {len(self._devices)} devices.")
+        return self._devices
+
+    def rescan(self, reinitialize=True):
+        """
+        Drops the cache and enumerates again. PortAudio only sees hot-plugged devices after it
+        is re-initialized, which would kill open streams, so callers pass reinitialize=False
+        while audio is running.
+        """
+        with self._lock:
+            if reinitialize:
+                try:
+                    sd._terminate()
+                    sd._initialize()
+                except Exception as e:
+                    logger.error(f"Could not re-initialize PortAudio: {e}")
+            self._devices = None
+            self._ensure()
+
+    def invalidate(self):
+        with self._lock:
+            self._devices = None
+
+    def names(self):
+        """Returns (input_keys, output_keys) in PortAudio order."""
+        with self._lock:
+            devices = self._ensure()
+            inputs = [d['key'] for d in devices if d['max_input_channels'] > 0]
+            outputs = [d['key'] for d in devices if d['max_output_channels'] > 0]
+        return inputs, outputs
+
+    def get(self, key):
+        with self._lock:
+            self._ensure()
+            return self._by_key.get(key)
+
+    def resolve(self, key, kind):
+        """Returns the PortAudio index for a "name, hostapi" key. kind is 'input' or 'output'."""
+        device = self.get(key)
+        channels = f"max_{kind}_channels"
+        if device is None or device[channels] <= 0:
+            raise ValueError(f"No {kind} device named '{key}'")
+        return device['index']
+
+    def key_for(self, index):
+        """Reverse of resolve(): the "name, hostapi" key for a PortAudio index, or None."""
+        with self._lock:
+            devices = self._ensure()
+            return next((d['key'] for d in devices if d['index'] == index), None)
+
+    def native_rate(self, index):
+        """The device's default (shared-mode) sample rate as an int, or None if unknown."""
+        with self._lock:
+            devices = self._ensure()
+            device = next((d for d in devices if d['index'] == index), None)
+        return int(device['default_samplerate']) if device and device['default_samplerate'] else None
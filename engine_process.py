@@ -0,0 +1,479 @@
+import json
+import multiprocessing
+import struct
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from audio_manager import AudioManager
+from sample_store import buffer_frames
+from logger_config import logger
+from latency_trace import tracer
+
+# Optional engine mode ("engine_mode": "process") where the audio streams and the mixer live in
+# a dedicated process. The GUI process keeps decoding and TTS rendering but only talks to the
+# engine through two shared-memory rings (commands in, events out); decoded sample buffers are
+# handed over as shared-memory blocks, so nothing in the GUI process can hold the GIL that the
+# real-time callback needs.
+
+RING_SLOTS = 256
+RING_SLOT_SIZE = 4096
+STATS_INTERVAL = 0.5
+POLL_INTERVAL = 0.002
+# Settings the engine's mixer and streams read; sent on reload instead of re-reading config.json there
+ENGINE_CONFIG_KEYS = (
+    "mic_gain_db", "noise_gate_enabled", "noise_gate_threshold_db", "noise_gate_attack_ms",
+    "noise_gate_release_ms", "limiter_ceiling_db", "limiter_lookahead_ms", "limiter_release_ms",
+    "routing", "streaming_ring_seconds",
+)
+
+
+def _attach_shared_memory(name):
+    """Attaches to a block owned by the other process without letting this process unlink it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        # The engine is spawned by multiprocessing and shares the parent's resource tracker, where the
+        # block is already registered. Unregistering here would drop the parent's entry, so
+        # registration and unlink() are left to the owning parent.
+        return shared_memory.SharedMemory(name=name)
+
+
+class ShmRing:
+    """
+    Single-producer / single-consumer ring of fixed-size JSON message slots in shared memory.
+    The header holds two int64 counters: head (next slot to write, only advanced by the producer)
+    and tail (next slot to read, only advanced by the consumer). A slot is published by bumping
+    head after its payload is written, so neither side ever blocks on the other.
+    """
+    HEADER_BYTES = 16
+
+    def __init__(self, name=None, slots=RING_SLOTS, slot_size=RING_SLOT_SIZE):
+        self.slots = slots
+        self.slot_size = slot_size
+        size = self.HEADER_BYTES + slots * slot_size
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(create=True, size=size) if self.owner else _attach_shared_memory(name)
+        self.name = self.shm.name
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+        self._slots = np.ndarray((slots, slot_size), dtype=np.uint8, buffer=self.shm.buf, offset=self.HEADER_BYTES)
+        if self.owner:
+            self._counters[:] = 0
+
+    def put(self, message):
+        payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        if len(payload) > self.slot_size - 4:
+            raise ValueError(f"message too large for ring slot ({len(payload)} bytes)")
+        head, tail = int(self._counters[0]), int(self._counters[1])
+        if head - tail >= self.slots:
+            return False
+        slot = self._slots[head % self.slots]
+        slot[:4] = np.frombuffer(struct.pack("<I", len(payload)), dtype=np.uint8)
+        slot[4:4 + len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        self._counters[0] = head + 1
+        return True
+
+    def get(self):
+        head, tail = int(self._counters[0]), int(self._counters[1])
+        if tail >= head:
+            return None
+        slot = self._slots[tail % self.slots]
+        length = struct.unpack("<I", slot[:4].tobytes())[0]
+        message = json.loads(slot[4:4 + length].tobytes())
+        self._counters[1] = tail + 1
+        return message
+
+    def close(self):
+        self._counters = None
+        self._slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# --- engine process side ---
+
+class _Engine:
+    def __init__(self, command_ring_name, event_ring_name):
+        from settings_manager import SettingsManager
+        self.commands = ShmRing(command_ring_name)
+        self.events = ShmRing(event_ring_name)
+        self.audio = AudioManager(SettingsManager())
+        self.audio.finished_voices = deque()
+        # Events wait here until the ring has room; run() is the only thread that writes the ring,
+        # and the negotiation thread only appends (rate changes)
+        self.outbox = deque()
+        self.audio.rate_listener = lambda rate: self.outbox.append({"event": "rate", "rate": rate})
+        self.attached = {}   # shm name -> (SharedMemory, sample buffer)
+        self.streams = {}    # stream id -> StreamingSource
+        self.groups = {}     # sequence id -> base position on the sample clock
+        self.running = True
+
+    def run(self):
+        last_stats = 0.0
+        while self.running:
+            handled = False
+            message = self.commands.get()
+            while message is not None:
+                handled = True
+                try:
+                    self._dispatch(message)
+                except Exception as e:
+                    logger.error(f"Engine command {message.get('cmd')} failed: {e}")
+                if not self.running:
+                    break
+                message = self.commands.get()
+            self._release_finished()
+            self._flush_events()
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                last_stats = now
+                stats = self.audio.get_stats()
+                stats.pop('latency', None)  # traces end in the GUI process, see ProcessAudioEngine
+                try:
+                    self.events.put({"event": "stats", "stats": stats})
+                except ValueError as e:
+                    logger.error(f"Engine stats not sent: {e}")
+            if not handled:
+                time.sleep(POLL_INTERVAL)
+        self.audio.stop_audio_processing()
+        self._release_finished(release_all=True)
+        self._flush_events()
+
+    def _flush_events(self):
+        while self.outbox and self.events.put(self.outbox[0]):
+            self.outbox.popleft()
+
+    def _dispatch(self, message):
+        cmd = message["cmd"]
+        audio = self.audio
+        if cmd == "start":
+            ok = False
+            try:
+                ids = [audio.resolve_device(key, kind) if key else None
+                       for key, kind in ((message["mic"], "input"), (message["output"], "output"),
+                                         (message.get("preview"), "output"))]
+                ok = audio.start_audio_processing(ids[0], ids[1], preview_output_device_id=ids[2],
+                                                  preview_enabled=message.get("preview_enabled", False))
+            except Exception as e:
+                logger.error(f"Engine could not start audio: {e}")
+            self.outbox.append({"event": "started", "seq": message["seq"], "ok": bool(ok)})
+        elif cmd == "stop":
+            audio.stop_audio_processing()
+        elif cmd == "play":
+            shm = _attach_shared_memory(message["shm"])
+            data = np.ndarray((message["frames"], message["channels"]), dtype=message["dtype"], buffer=shm.buf)
+            buffer = {'data': data, 'scale': np.float32(message["scale"])}
+            self.attached[message["shm"]] = (shm, buffer)
+            if "group" in message:
+                # Items of one sequence share the sample clock position of the first one
+                if len(self.groups) > 64:
+                    self.groups.pop(next(iter(self.groups)))
+                base = self.groups.setdefault(message["group"], audio._sample_clock)
+                queued = audio.schedule_samples(buffer, delay_samples=base + message["delay"] - audio._sample_clock)
+            elif "at" in message or "delay" in message:
+                queued = audio.schedule_samples(buffer, at_time=message.get("at"), delay_samples=message.get("delay"))
+            else:
+                queued = audio.play_samples(buffer, bus=message.get("bus", "effects"))
+            if queued is None or queued is False:
+                self._release(message["shm"])
+        elif cmd == "stream":
+            source = audio.play_stream(message["file"], loop=message.get("loop", False),
+                                       start_seconds=message.get("start", 0.0))
+            if source is not None:
+                self.streams[message["id"]] = source
+        elif cmd == "stream_seek":
+            source = self.streams.get(message["id"])
+            if source is not None:
+                source.seek(message["seconds"])
+        elif cmd == "stream_close":
+            source = self.streams.pop(message["id"], None)
+            if source is not None:
+                source.close()
+        elif cmd == "stop_all":
+            audio.stop_all_sounds()
+        elif cmd == "mode":
+            audio.set_mode(message["mode"])
+        elif cmd == "volume":
+            audio.set_effects_gain(message["db"])
+        elif cmd == "reload":
+            # Only what the mixer uses; the engine never plays from its own tone banks or effect cache
+            audio.settings.config.update(message["config"])  # in memory, config.json is the GUI's
+            audio.streaming_ring_seconds = audio.settings.get("streaming_ring_seconds") or 4.0
+            audio.set_effects_gain(message["db"])
+            audio._post_processors()
+        elif cmd == "preview":
+            if "device" in message:
+                audio.preview_device_id = audio.resolve_device(message["device"], "output") if message["device"] else None
+            audio.update_preview_enabled(message["enabled"])
+        elif cmd == "record":
+            if message.get("path"):
+                audio.start_recording(message["path"])
+            else:
+                result = audio.stop_recording()
+                if result is not None:
+                    self.outbox.append({"event": "recorded", **result})
+        elif cmd == "shutdown":
+            self.running = False
+
+    def _release(self, name):
+        shm, buffer = self.attached.pop(name)
+        buffer['data'] = None
+        shm.close()
+        self.outbox.append({"event": "released", "shm": name})
+
+    def _release_finished(self, release_all=False):
+        """Frees the shared blocks and stream handles of voices the mixer reported as finished."""
+        finished = self.audio.finished_voices
+        done_buffers, done_streams = set(), set()
+        while finished:
+            voice = finished.popleft()
+            if 'stream' in voice:
+                done_streams.add(id(voice['stream']))
+            else:
+                done_buffers.add(id(voice['buffer']))
+        for name, (shm, buffer) in list(self.attached.items()):
+            if release_all or id(buffer) in done_buffers:
+                self._release(name)
+        for stream_id, source in list(self.streams.items()):
+            if release_all or id(source) in done_streams:
+                del self.streams[stream_id]
+
+
+def _engine_main(command_ring_name, event_ring_name):
+    engine = _Engine(command_ring_name, event_ring_name)
+    logger.info("Audio engine process started.")
+    engine.run()
+    engine.commands.close()
+    engine.events.close()
+    logger.info("Audio engine process stopped.")
+
+
+# --- GUI process side ---
+
+class RemoteStream:
+    """Handle for a StreamingSource that lives in the engine process."""
+    def __init__(self, engine, stream_id):
+        self._engine = engine
+        self.id = stream_id
+
+    def seek(self, seconds):
+        self._engine._send({"cmd": "stream_seek", "id": self.id, "seconds": float(seconds)})
+
+    def close(self):
+        self._engine._send({"cmd": "stream_close", "id": self.id})
+
+
+class ProcessAudioEngine(AudioManager):
+    """
+    Drop-in AudioManager whose streams and mixer run in a separate process. Decoding, TTS
+    rendering and device enumeration still happen here; everything that touches the real-time
+    path is sent as a command. Several threads here may send commands, so they serialize on a
+    local lock; the engine's consumer side never waits on it.
+    """
+
+    def __init__(self, settings_manager):
+        super().__init__(settings_manager)
+        self._commands = ShmRing()
+        self._events = ShmRing()
+        self._send_lock = threading.Lock()
+        self._shared = {}        # shm name -> SharedMemory kept alive until the engine releases it
+        self._pending_starts = {}
+        self._seq = 0
+        self._remote_stats = {}
+        self._recording = None
+        ctx = multiprocessing.get_context("spawn")
+        self._process = ctx.Process(target=_engine_main, args=(self._commands.name, self._events.name),
+                                    name="deltatoner-engine", daemon=True)
+        self._process.start()
+        self._event_thread = threading.Thread(target=self._poll_events, name="engine-events", daemon=True)
+        self._event_thread.start()
+        self._engine_ready = True  # AudioManager.__init__ already calls reload_config before this
+
+    def _send(self, message):
+        with self._send_lock:
+            for _ in range(100):
+                if self._commands.put(message):
+                    return True
+                time.sleep(POLL_INTERVAL)
+        logger.error(f"Engine command ring full, dropped '{message.get('cmd')}'.")
+        return False
+
+    def _post(self, op, *args):
+        # The mixer lives in the engine; everything it needs is sent as an explicit command instead
+        return True
+
+    def _poll_events(self):
+        while self._process.is_alive() or self._events is not None:
+            events = self._events
+            if events is None:
+                break
+            message = events.get()
+            if message is None:
+                time.sleep(POLL_INTERVAL * 5)
+                continue
+            kind = message.get("event")
+            if kind == "released":
+                shm = self._shared.pop(message["shm"], None)
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+            elif kind == "recorded":
+                self._recording = None
+                logger.info(f"Engine recording saved to {message['path']} ({message['seconds']}s).")
+            elif kind == "stats":
+                self._remote_stats = message["stats"]
+            elif kind == "rate":
+                # Buffers are decoded here, so they have to follow the engine's negotiated rate
+                threading.Thread(target=self.set_sample_rate, args=(message["rate"], False),
+                                 name="rate-adopt", daemon=True).start()
+            elif kind == "started":
+                pending = self._pending_starts.get(message["seq"])
+                if pending is not None:
+                    pending[1] = message["ok"]
+                    pending[0].set()
+
+    def start_audio_processing(self, mic_device_id, output_device_id, preview_output_device_id=None, preview_enabled=False):
+        if self.is_running:
+            return
+        self.preview_enabled = preview_enabled
+        self.preview_device_id = preview_output_device_id
+        self._seq += 1
+        seq = self._seq
+        pending = [threading.Event(), False]
+        self._pending_starts[seq] = pending
+        # Device indices are not guaranteed to match across processes; send the stable keys
+        self._send({
+            "cmd": "start", "seq": seq,
+            "mic": self.devices.key_for(mic_device_id),
+            "output": self.devices.key_for(output_device_id),
+            "preview": self.devices.key_for(preview_output_device_id) if preview_output_device_id is not None else None,
+            "preview_enabled": preview_enabled,
+        })
+        pending[0].wait(timeout=10)
+        self._pending_starts.pop(seq, None)
+        self.is_running = bool(pending[1])
+        return self.is_running
+
+    def stop_audio_processing(self):
+        if not self.is_running:
+            return
+        self._send({"cmd": "stop"})
+        self.is_running = False
+        self._recording = None  # the engine closes any recording along with the streams
+        logger.info("Engine audio streams stopped.")
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.mute_effects = mode == "pass-through"
+        self._send({"cmd": "mode", "mode": mode})
+
+    def set_effects_gain(self, db_level):
+        super().set_effects_gain(db_level)  # tone banks used for TTS rendering are levelled here
+        self._send({"cmd": "volume", "db": self.effects_volume_db})
+
+    def reload_config(self):
+        super().reload_config()
+        if getattr(self, "_engine_ready", False):
+            self._send({"cmd": "reload", "db": self.effects_volume_db,
+                        "config": {key: self.settings.get(key) for key in ENGINE_CONFIG_KEYS}})
+
+    def update_preview_enabled(self, enabled):
+        self.preview_enabled = enabled
+        self._send({"cmd": "preview", "enabled": enabled})
+
+    def set_preview_device_id(self, device_id):
+        self.preview_device_id = device_id
+        key = self.devices.key_for(device_id) if device_id is not None else None
+        self._send({"cmd": "preview", "enabled": self.preview_enabled, "device": key})
+
+    def stop_all_sounds(self):
+        self._send({"cmd": "stop_all"})
+        logger.info("All sound effects stopped.")
+
+    def play_samples(self, buffer, trace=None, bus='effects', **timing):
+        if self.mute_effects or buffer_frames(buffer) == 0:
+            return False
+        data = buffer['data']
+        shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[:] = data
+        self._shared[shm.name] = shm
+        sent = self._send({
+            "cmd": "play", "shm": shm.name, "frames": data.shape[0], "channels": data.shape[1],
+            "dtype": data.dtype.name, "scale": float(buffer['scale']), "bus": bus, **timing,
+        })
+        if not sent:
+            self._shared.pop(shm.name, None)
+            shm.close()
+            shm.unlink()
+        elif trace is not None:
+            # The engine's output blocks are in another process; the trace ends at the hand-off
+            tracer.finish(trace, "handoff")
+        return sent
+
+    def schedule_samples(self, buffer, at_time=None, delay_samples=None):
+        # at_time is on the engine's stream clock; the returned start position is not known here
+        timing = {"at": float(at_time)} if at_time is not None else {"delay": max(0, int(delay_samples or 0))}
+        return self.play_samples(buffer, **timing) or None
+
+    def schedule_sequence(self, events, at_time=None):
+        if self.mute_effects:
+            return None
+        self._seq += 1
+        group = self._seq
+        if at_time is not None:
+            logger.warning("Engine process schedules sequences from the next block; at_time is ignored.")
+        for offset, buffer in events:
+            self.play_samples(buffer, group=group, delay=int(round(offset * self.sample_rate)))
+        return group
+
+    def play_stream(self, sound_file, loop=False, start_seconds=0.0):
+        if self.mute_effects:
+            return None
+        self._seq += 1
+        stream_id = self._seq
+        self._send({"cmd": "stream", "id": stream_id, "file": self._resolve_sound_path(sound_file),
+                    "loop": loop, "start": float(start_seconds)})
+        return RemoteStream(self, stream_id)
+
+    def start_recording(self, path=None):
+        if self._recording is None:
+            self._recording = path or self.new_recording_path()
+            self._send({"cmd": "record", "path": self._recording})
+        return self._recording
+
+    def stop_recording(self):
+        # The engine finalizes the file and reports it with a "recorded" event
+        if self._recording is None:
+            return None
+        self._send({"cmd": "record"})
+        return {'path': self._recording}
+
+    def get_stats(self):
+        stats = dict(self._remote_stats)
+        stats['engine'] = 'process'
+        stats['latency'] = tracer.report()
+        # Caches live here, voices and output buffers in the engine
+        stats['engine_memory_bytes'] = stats.pop('memory_bytes', {})
+        stats['memory_bytes'] = self.memory.usage()
+        stats['engine_alive'] = self._process.is_alive()
+        stats['shared_buffers'] = len(self._shared)
+        return stats
+
+    def shutdown(self):
+        """Stops the engine process and frees every shared-memory block."""
+        if self._events is None:
+            return
+        self._send({"cmd": "shutdown"})
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        events, self._events = self._events, None
+        self._event_thread.join(timeout=1)
+        for shm in self._shared.values():
+            shm.close()
+            shm.unlink()
+        self._shared.clear()
+        self._commands.close()
+        events.close()
@@ -5,6 +5,9 @@ from audio_manager import AudioManager
 from settings_manager import SettingsManager
 from logger_config import logger
 from hotkeyer import PhraseDetector
+from job_manager import JobManager
+from latency_trace import tracer
+from asset_pack import assets
 
 
 class CustomWindow(QtWidgets.QWidget):
@@ -13,15 +16,13 @@ class CustomWindow(QtWidgets.QWidget):
         self.audio_manager = audio_manager
         self.settings = settings_manager
         self.phrase_detector = PhraseDetector()
+        self.jobs = JobManager(self)
         self.mode = "merged"  # Default mode
 
-        assets = "assets"
-        def img(name): return os.path.join(assets, name)
+        # Images come from the asset pack and are decoded on first use; hover/press states and
+        # character portraits are only looked up when they are shown
+        icon = assets.icon
 
-        self.sans_pixmap = QtGui.QPixmap(img("sans.png"))
-        self.spamton_pixmap = QtGui.QPixmap(img("spamton.png"))
-        self.tenna_pixmap = QtGui.QPixmap(img("tenna.png"))
-        
         self.auto_tts_thread = None
         self.auto_tts_worker = None
 
@@ -32,11 +33,11 @@ class CustomWindow(QtWidgets.QWidget):
         self.is_hidden = False
 
         self.bg_label = QtWidgets.QLabel(self)
-        self.bg_label.setPixmap(QtGui.QPixmap(img("window_frame.png")))
+        self.bg_label.setPixmap(assets.pixmap("window_frame.png"))
         self.bg_label.setGeometry(0, 0, 940, 530)
 
         self.topbar_label = QtWidgets.QLabel(self)
-        self.topbar_label.setPixmap(QtGui.QPixmap(img("window_topbar.png")))
+        self.topbar_label.setPixmap(assets.pixmap("window_topbar.png"))
         self.topbar_label.setGeometry(0, 0, 940, 23)
         self.topbar_label.setAttribute(QtCore.Qt.WidgetAttribute.WA_TransparentForMouseEvents, False)
 
@@ -44,29 +45,27 @@ class CustomWindow(QtWidgets.QWidget):
         self.min_btn.setGeometry(800, 0, 44, 28)
         self.min_btn.setFlat(True)
         self.min_btn.setStyleSheet("background: transparent; border: none;")
-        self.min_img, self.min_hover_img, self.min_press_img = QtGui.QIcon(img("minimize2.png")), QtGui.QIcon(img("minimize2_hover.png")), QtGui.QIcon(img("minimize2_press.png"))
-        self.min_btn.setIcon(self.min_img)
+        self.min_btn.setIcon(icon("minimize2.png"))
         self.min_btn.setIconSize(QtCore.QSize(44, 28))
 
         self.close_btn = QtWidgets.QPushButton(self)
         self.close_btn.setGeometry(850, 0, 44, 28)
         self.close_btn.setFlat(True)
         self.close_btn.setStyleSheet("background: transparent; border: none;")
-        self.close_img, self.close_hover_img, self.close_press_img = QtGui.QIcon(img("close2.png")), QtGui.QIcon(img("close2_hover.png")), QtGui.QIcon(img("close2_press.png"))
-        self.close_btn.setIcon(self.close_img)
+        self.close_btn.setIcon(icon("close2.png"))
         self.close_btn.setIconSize(QtCore.QSize(44, 28))
 
         self.topbar_label.mousePressEvent = self._start_move
         self.topbar_label.mouseMoveEvent = self._do_move
 
-        self.min_btn.enterEvent = lambda e: self.min_btn.setIcon(self.min_hover_img)
-        self.min_btn.leaveEvent = lambda e: self.min_btn.setIcon(self.min_img)
-        self.min_btn.pressed.connect(lambda: self.min_btn.setIcon(self.min_press_img))
+        self.min_btn.enterEvent = lambda e: self.min_btn.setIcon(icon("minimize2_hover.png"))
+        self.min_btn.leaveEvent = lambda e: self.min_btn.setIcon(icon("minimize2.png"))
+        self.min_btn.pressed.connect(lambda: self.min_btn.setIcon(icon("minimize2_press.png")))
         self.min_btn.released.connect(self._on_minimize_release)
 
-        self.close_btn.enterEvent = lambda e: self.close_btn.setIcon(self.close_hover_img)
-        self.close_btn.leaveEvent = lambda e: self.close_btn.setIcon(self.close_img)
-        self.close_btn.pressed.connect(lambda: self.close_btn.setIcon(self.close_press_img))
+        self.close_btn.enterEvent = lambda e: self.close_btn.setIcon(icon("close2_hover.png"))
+        self.close_btn.leaveEvent = lambda e: self.close_btn.setIcon(icon("close2.png"))
+        self.close_btn.pressed.connect(lambda: self.close_btn.setIcon(icon("close2_press.png")))
         self.close_btn.released.connect(self._on_close_release)
 
         self._moving = False
@@ -95,20 +94,13 @@ class CustomWindow(QtWidgets.QWidget):
         controls_layout.addWidget(self.indicator, 0, 0)
 
         # Auto TTS Button
-        self.auto_tts_img = QtGui.QIcon(img("KeyerIdle.png"))
-        self.auto_tts_img_hover = QtGui.QIcon(img("KeyerHover.png"))
-        self.auto_tts_img_press = QtGui.QIcon(img("KeyerPress.png"))
-        self.auto_tts_img_active = QtGui.QIcon(img("KeyerIdleAlt.png"))
-        self.auto_tts_img_active_hover = QtGui.QIcon(img("KeyerHoverAlt.png"))
-        self.auto_tts_img_active_press = QtGui.QIcon(img("KeyerPressAlt.png"))
-        
         self.auto_tts_btn = QtWidgets.QPushButton()
         self.auto_tts_btn.setCheckable(True)  # Make the button toggleable
         self.auto_tts_btn.setChecked(False)   # Initial state: off
-        self.auto_tts_btn.setIcon(self.auto_tts_img)
-        self.auto_tts_btn.enterEvent = lambda e: self.auto_tts_btn.setIcon(self.auto_tts_img_hover)
-        self.auto_tts_btn.leaveEvent = lambda e: self.auto_tts_btn.setIcon(self.auto_tts_img)
-        self.auto_tts_btn.pressed.connect(lambda: self.auto_tts_btn.setIcon(self.auto_tts_img_press))
+        self.auto_tts_btn.setIcon(icon("KeyerIdle.png"))
+        self.auto_tts_btn.enterEvent = lambda e: self.auto_tts_btn.setIcon(icon("KeyerHover.png"))
+        self.auto_tts_btn.leaveEvent = lambda e: self.auto_tts_btn.setIcon(icon("KeyerIdle.png"))
+        self.auto_tts_btn.pressed.connect(lambda: self.auto_tts_btn.setIcon(icon("KeyerPress.png")))
         self.auto_tts_btn.setIconSize(QtCore.QSize(48, 48))
         self.auto_tts_btn.setStyleSheet("border: none; background: transparent;")
         self.auto_tts_btn.toggled.connect(self._toggle_auto_tts)
@@ -118,12 +110,10 @@ class CustomWindow(QtWidgets.QWidget):
         self.preview_btn = QtWidgets.QPushButton()
         self.preview_btn.setCheckable(True)  # Make the button toggleable
         self.preview_btn.setChecked(False)   # Initial state: off
-        pv_unactive_icon = QtGui.QIcon(img("mic_off.png"))
-        pv_active_icon = QtGui.QIcon(img("mic_on.png"))
-        self.preview_btn.setIcon(pv_unactive_icon)
+        self.preview_btn.setIcon(icon("mic_off.png"))
         self.preview_btn.setIconSize(QtCore.QSize(48, 48))
         self.preview_btn.setStyleSheet("border: none; background: transparent;")
-        self.preview_btn.toggled.connect(lambda checked: self.preview_btn.setIcon(pv_active_icon if checked else pv_unactive_icon))
+        self.preview_btn.toggled.connect(lambda checked: self.preview_btn.setIcon(icon("mic_on.png" if checked else "mic_off.png")))
         controls_layout.addWidget(self.preview_btn, 0, 4)
         self.preview_btn.toggled.connect(self._toggle_preview)
 
@@ -132,7 +122,7 @@ class CustomWindow(QtWidgets.QWidget):
         settings_button = QtWidgets.QPushButton(self)
         settings_button.clicked.connect(self.open_settings)
         settings_button.setStyleSheet("background: transparent; border: none;")
-        settings_button.setIcon(QtGui.QIcon(img("gear.png")))
+        settings_button.setIcon(icon("gear.png"))
         settings_button.setIconSize(QtCore.QSize(48, 48))
         controls_layout.addWidget(settings_button, 0, 5)
 
@@ -172,11 +162,16 @@ class CustomWindow(QtWidgets.QWidget):
                 background-color: #FF9191; 
             }
         """)
-        self.stop_all_button.clicked.connect(self.audio_manager.stop_all_sounds)
+        self.stop_all_button.clicked.connect(self._stop_all_sounds)
+        self.record_button = QtWidgets.QPushButton("Record")
+        self.record_button.setCheckable(True)
+        self.record_button.setEnabled(False)
+        self.record_button.toggled.connect(self._toggle_recording)
         controls_layout.addWidget(self.mode_menu, 2, 0, 1, 2)
         controls_layout.addWidget(QtWidgets.QLabel("Effects Vol (dB):"), 2, 1)
         controls_layout.addWidget(self.volume_slider, 2, 2)
         controls_layout.addWidget(self.volume_display_label, 2, 4)
+        controls_layout.addWidget(self.record_button, 2, 3)
         controls_layout.addWidget(self.stop_all_button, 2, 5)
 
         # Sound Effects Area
@@ -256,10 +251,10 @@ class CustomWindow(QtWidgets.QWidget):
         self._moving = False
     def _on_minimize_release(self):
         if self._is_mouse_over(self.min_btn): self.showMinimized()
-        self.min_btn.setIcon(self.min_img)
+        self.min_btn.setIcon(assets.icon("minimize2.png"))
     def _on_close_release(self):
         if self._is_mouse_over(self.close_btn): self.close()
-        self.close_btn.setIcon(self.close_img)
+        self.close_btn.setIcon(assets.icon("close2.png"))
     def _is_mouse_over(self, widget):
         return widget.rect().contains(widget.mapFromGlobal(QtGui.QCursor.pos()))
     def closeEvent(self, event):
@@ -268,7 +263,8 @@ class CustomWindow(QtWidgets.QWidget):
 
     # --- App widgets ---
     def apply_settings(self, config):
-        self.audio_manager.reload_config()
+        # Reloading decodes the tone banks; keep it off the Qt thread
+        self.jobs.submit("settings", self.audio_manager.reload_config, key="reload_config")
         if hasattr(self, 'mic_menu'):
             self.populate_devices()
             initial_db = self.settings.get("effects_volume_db")
@@ -319,11 +315,52 @@ class CustomWindow(QtWidgets.QWidget):
                 and not speak_pattern.match(sound_file) \
                 and not vspeak_pattern.match(sound_file):
                 button = QtWidgets.QPushButton(os.path.splitext(sound_file)[0])
-                button.clicked.connect(lambda _, sf=sound_file: self.audio_manager.play_sound_effect(sf))
+                button.clicked.connect(lambda _, sf=sound_file: self._play_sound_effect(sf))
                 self.sound_grid.addWidget(button, row, col)
                 col += 1
                 if col >= 5: row, col = row + 1, 0
 
+        # Macros from config, each plays as one pre-rendered voice
+        for name in self.audio_manager.macros.names():
+            button = QtWidgets.QPushButton(f"[{name}]")
+            button.clicked.connect(lambda _, m=name: self._play_macro(m))
+            self.sound_grid.addWidget(button, row, col)
+            col += 1
+            if col >= 5: row, col = row + 1, 0
+
+    def _play_sound_effect(self, sound_file):
+        # Decoding can take a while, keep it off the GUI thread
+        self.jobs.submit("decode", self._run_sound_effect, sound_file, tracer.start("soundboard"))
+
+    def _run_sound_effect(self, sound_file, trace):
+        trace.mark("job_wait")
+        self.audio_manager.play_sound_effect(sound_file, trace)
+
+    def _play_macro(self, name):
+        # Same lane as effects; a macro is only decoded and rendered on its first use
+        self.jobs.submit("decode", self.audio_manager.play_macro, name)
+
+    def _stop_all_sounds(self):
+        self.jobs.cancel_all(lanes=("tts", "decode"))  # settings changes still apply
+        self.audio_manager.stop_all_sounds()
+
+    def _toggle_recording(self, checked):
+        if checked:
+            try:
+                path = self.audio_manager.start_recording()
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "Recording Error", f"Could not start recording:\n{e}")
+                self.record_button.setChecked(False)
+                return
+            self.record_button.setText("Recording...")
+            self.record_button.setToolTip(path)
+        else:
+            result = self.audio_manager.stop_recording()
+            self.record_button.setText("Record")
+            if result and result.get('dropped_blocks'):
+                QtWidgets.QMessageBox.warning(self, "Recording", f"Saved {result['path']}, but {result['dropped_blocks']} blocks "
+                                              "were dropped because the disk could not keep up.")
+
     def _toggle_preview(self, checked):
         logger.info(f"Preview toggled: {'ON' if checked else 'OFF'}")
         self.audio_manager.update_preview_enabled(checked)
@@ -335,13 +372,12 @@ class CustomWindow(QtWidgets.QWidget):
 
     # --- Methods to connect UI to backend logic ---
     def _start_processing(self):
-        import sounddevice as sd
         mic_name, output_name = self.mic_menu.currentText(), self.output_menu.currentText()
         speakers_name = self.speakers_menu.currentText()
         try:
-            mic_id = sd.query_devices(mic_name, 'input')['index']
-            output_id = sd.query_devices(output_name, 'output')['index']
-            speakers_id = sd.query_devices(speakers_name, 'output')['index']
+            mic_id = self.audio_manager.resolve_device(mic_name, 'input')
+            output_id = self.audio_manager.resolve_device(output_name, 'output')
+            speakers_id = self.audio_manager.resolve_device(speakers_name, 'output')
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Device Error", f"Could not open selected devices:\n{e}")
             return
@@ -354,18 +390,18 @@ class CustomWindow(QtWidgets.QWidget):
             self.output_menu.setEnabled(False)
             self.speakers_menu.setEnabled(False)
             self.preview_btn.setEnabled(False)
+            self.record_button.setEnabled(True)
             self.status_label.setText(f"Running [{self.mode}]")
             self.status_label.setStyleSheet("background: none; color: #222; background-color: #b6e6b3; font-weight: bold; font-size: 18px; border-radius: 8px; border: 1px solid #bbb;")
             self.character = self.settings.get("speaktone_file")[:-4]
-            if self.character == "sans-SpeakTone":
-                indicator_pixmap = self.sans_pixmap
-            elif self.character == "spamton-SpeakTone":
-                indicator_pixmap = self.spamton_pixmap
-            elif self.character == "tenna--VSpeakTone1":
-                indicator_pixmap = self.tenna_pixmap
-            self.indicator.setPixmap(indicator_pixmap)
+            # Portraits are decoded the first time a character is started with
+            portraits = {"sans-SpeakTone": "sans.png", "spamton-SpeakTone": "spamton.png", "tenna--VSpeakTone1": "tenna.png"}
+            if self.character in portraits:
+                self.indicator.setPixmap(assets.pixmap(portraits[self.character]))
 
     def _stop_processing(self):
+        self.record_button.setChecked(False)  # finalizes the file before the streams close
+        self.record_button.setEnabled(False)
         self.audio_manager.stop_audio_processing()
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
@@ -379,19 +415,39 @@ class CustomWindow(QtWidgets.QWidget):
     def _change_mode(self, mode_text):
         logger.info(f"Mode: {mode_text}")
         self.mode = mode_text.lower().replace(" ", "_")
-        self.audio_manager.mode = mode_text.lower().replace(" ", "_")
+        self.audio_manager.set_mode(self.mode)
 
     def _update_volume_display(self, value):
         self.volume_display_label.setText(f"{float(value):.1f}")
-        self.audio_manager.set_effects_volume(float(value))
+        # The gain applies right away; re-levelling runs once the slider settles (pending ticks coalesce)
+        self.audio_manager.set_effects_gain(float(value))
+        self.jobs.submit("settings", self.audio_manager.relevel_effects, key="relevel_effects")
 
     def _generate_tts(self):
         text = self.tts_input.text()
-        if text and self.audio_manager.generate_tts_audio(text):
+        if text:
+            self.jobs.submit("tts", self.audio_manager.generate_tts_audio, text,
+                             key="tts", on_done=self._on_tts_generated)
+
+    def _on_tts_generated(self, ok):
+        if ok:
             self.play_tts_button.setEnabled(True)
 
     def _play_tts(self):
-        self.audio_manager.play_generated_tts()
+        # Same lane as rendering so playback never reads a half-written temp file
+        self.jobs.submit("tts", self.audio_manager.play_generated_tts)
+
+    def _speak_phrase(self, phrase, trace=None):
+        if trace is not None:
+            trace.mark("job_wait")
+        # "/name" typed with the hotkeyer triggers a macro instead of speaking the text
+        if phrase.startswith("/") and phrase[1:] in self.audio_manager.macros.definitions():
+            self.audio_manager.play_macro(phrase[1:], trace)
+            return
+        if self.audio_manager.generate_tts_audio(phrase):
+            if trace is not None:
+                trace.mark("render")
+            self.audio_manager.play_generated_tts(trace)
 
 
     # Auto TTS
@@ -399,6 +455,7 @@ class CustomWindow(QtWidgets.QWidget):
         # Stop the worker thread if it's running
         if self.auto_tts_thread and self.auto_tts_thread.isRunning():
             self.stop_auto_tts()
+        self.jobs.shutdown()
         
         if self.audio_manager.is_running: self._stop_processing()
         QtWidgets.QApplication.quit()
@@ -406,26 +463,28 @@ class CustomWindow(QtWidgets.QWidget):
         if checked:
             self.start_auto_tts()
             if self.audio_manager.is_running:
-                self.auto_tts_btn.setIcon(self.auto_tts_img_active)
-                self.auto_tts_btn.enterEvent = lambda e: self.auto_tts_btn.setIcon(self.auto_tts_img_active_hover)
-                self.auto_tts_btn.leaveEvent = lambda e: self.auto_tts_btn.setIcon(self.auto_tts_img_active)
-                self.auto_tts_btn.pressed.connect(lambda: self.auto_tts_btn.setIcon(self.auto_tts_img_active_press))
+                self.auto_tts_btn.setIcon(assets.icon("KeyerIdleAlt.png"))
+                self.auto_tts_btn.enterEvent = lambda e: self.auto_tts_btn.setIcon(assets.icon("KeyerHoverAlt.png"))
+                self.auto_tts_btn.leaveEvent = lambda e: self.auto_tts_btn.setIcon(assets.icon("KeyerIdleAlt.png"))
+                self.auto_tts_btn.pressed.connect(lambda: self.auto_tts_btn.setIcon(assets.icon("KeyerPressAlt.png")))
         else:
             self.stop_auto_tts()
-            self.auto_tts_btn.setIcon(self.auto_tts_img)
-            self.auto_tts_btn.enterEvent = lambda e: self.auto_tts_btn.setIcon(self.auto_tts_img_hover)
-            self.auto_tts_btn.leaveEvent = lambda e: self.auto_tts_btn.setIcon(self.auto_tts_img)
-            self.auto_tts_btn.pressed.connect(lambda: self.auto_tts_btn.setIcon(self.auto_tts_img_press))
+            self.auto_tts_btn.setIcon(assets.icon("KeyerIdle.png"))
+            self.auto_tts_btn.enterEvent = lambda e: self.auto_tts_btn.setIcon(assets.icon("KeyerHover.png"))
+            self.auto_tts_btn.leaveEvent = lambda e: self.auto_tts_btn.setIcon(assets.icon("KeyerIdle.png"))
+            self.auto_tts_btn.pressed.connect(lambda: self.auto_tts_btn.setIcon(assets.icon("KeyerPress.png")))
     
-    @QtCore.pyqtSlot(str)
-    def _on_phrase_detected(self, phrase):
+    @QtCore.pyqtSlot(str, object)
+    def _on_phrase_detected(self, phrase, trace=None):
         """This slot is executed in the main thread when the worker emits a signal."""
+        if trace is not None:
+            trace.mark("signal")
         if phrase == "exit":
             self.auto_tts_btn.setChecked(False) # This will trigger stop_auto_tts
         elif phrase:
             logger.info(f"Auto TTS generating for phrase: {phrase}")
-            if self.audio_manager.generate_tts_audio(phrase):
-                self.audio_manager.play_generated_tts()
+            # A newer phrase supersedes one that has not started rendering yet
+            self.jobs.submit("tts", self._speak_phrase, phrase, trace, key="auto_tts")
 
     def start_auto_tts(self):
         """Starts the background thread for phrase detection."""
@@ -463,7 +522,7 @@ class CustomWindow(QtWidgets.QWidget):
 
 # --- Worker class to handle blocking tasks in a separate thread ---
 class AutoTTSWorker(QtCore.QObject):
-    phrase_detected = QtCore.pyqtSignal(str)
+    phrase_detected = QtCore.pyqtSignal(str, object)  # phrase, latency trace
     finished = QtCore.pyqtSignal()
 
     def __init__(self, phrase_detector: PhraseDetector):
@@ -479,7 +538,7 @@ class AutoTTSWorker(QtCore.QObject):
             # listen_for_phrase will block until enter is pressed or stop() is called
             phrase = self.phrase_detector.listen_for_phrase()
             if self._is_running and phrase:
-                self.phrase_detected.emit(phrase)
+                self.phrase_detected.emit(phrase, self.phrase_detector.trace)
         self.finished.emit()
         logger.info("Auto TTS worker thread finished.")
 
@@ -504,30 +563,29 @@ class SettingsDialog(QtWidgets.QDialog):
         layout.addRow("Window Title:", self.title_entry)
 
         # Default Mic
-        input_devices, output_devices = parent.audio_manager.get_audio_devices()
+        self.audio_manager = parent.audio_manager
         self.mic_menu = QtWidgets.QComboBox()
-        self.mic_menu.addItems(input_devices if input_devices else ["None"])
-        saved_mic_device = self.config.get("default_mic_name")
-        if saved_mic_device in input_devices:
-            self.mic_menu.setCurrentText(saved_mic_device)
         layout.addRow("Default Mic:", self.mic_menu)
 
         # Default Output
         self.cable_menu = QtWidgets.QComboBox()
-        self.cable_menu.addItems(output_devices if output_devices else ["None"])
-        saved_output_device = self.config.get("virtual_cable_name")
-        if saved_output_device in output_devices:
-            self.cable_menu.setCurrentText(saved_output_device)
         layout.addRow("Default Cable INPUT:", self.cable_menu)
 
         # Speakers device combo box
         self.speakers_menu = QtWidgets.QComboBox()
-        self.speakers_menu.addItems(output_devices if output_devices else ["None"])
-        saved_speakers = self.config.get("speakers_name")
-        if saved_speakers in output_devices:
-            self.speakers_menu.setCurrentText(saved_speakers)
         layout.addRow("Default Speakers:", self.speakers_menu)
 
+        # Devices are cached; rescan picks up anything plugged in since startup
+        rescan_button = QtWidgets.QPushButton("Rescan Devices")
+        rescan_button.clicked.connect(self._rescan_devices)
+        layout.addRow("", rescan_button)
+        self._fill_device_menus()
+
+        # Trigger-to-output latency per stage, collected while the app runs
+        latency_button = QtWidgets.QPushButton("Latency Report...")
+        latency_button.clicked.connect(self._show_latency_report)
+        layout.addRow("", latency_button)
+
         # Effects Folder
         self.effects_path_entry = QtWidgets.QLineEdit(self.config.get("sound_effects_path"))
         layout.addRow("Effects Folder:", self.effects_path_entry)
@@ -592,6 +650,36 @@ class SettingsDialog(QtWidgets.QDialog):
         btn_box.rejected.connect(self.reject)
         layout.addRow(btn_box)
 
+    def _fill_device_menus(self):
+        input_devices, output_devices = self.audio_manager.get_audio_devices()
+        for menu, devices, key in (
+            (self.mic_menu, input_devices, "default_mic_name"),
+            (self.cable_menu, output_devices, "virtual_cable_name"),
+            (self.speakers_menu, output_devices, "speakers_name"),
+        ):
+            current = menu.currentText() or self.config.get(key)
+            menu.clear()
+            menu.addItems(devices if devices else ["None"])
+            if current in devices:
+                menu.setCurrentText(current)
+
+    def _show_latency_report(self):
+        box = QtWidgets.QMessageBox(self)
+        box.setWindowTitle("Latency Report")
+        box.setText(tracer.format_report())
+        box.setStyleSheet("QLabel { font-family: monospace; }")
+        save_button = box.addButton("Save...", QtWidgets.QMessageBox.ButtonRole.ActionRole)
+        box.addButton(QtWidgets.QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() is save_button:
+            path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Save Latency Report", "latency_report.json", "JSON (*.json)")
+            if path:
+                tracer.dump(path)
+
+    def _rescan_devices(self):
+        self.audio_manager.rescan_devices()
+        self._fill_device_menus()
+
     def save_and_close(self):
         try:
             tts_pause = int(self.tts_pause_entry.text())
@@ -599,7 +687,8 @@ class SettingsDialog(QtWidgets.QDialog):
             QtWidgets.QMessageBox.critical(self, "Invalid Input", "TTS Pause must be a number (in milliseconds).")
             return
 
-        new_config = self.config.copy()
+        # Only the keys this dialog edits; anything saved while it was open (stream tuning) stays
+        new_config = {}
         new_config["app_name"] = self.title_entry.text()
         new_config["default_mic_name"] = self.mic_menu.currentText()
         new_config["virtual_cable_name"] = self.cable_menu.currentText()
@@ -613,5 +702,5 @@ class SettingsDialog(QtWidgets.QDialog):
         else:
             new_config["speaktone_file"] = ""
 
-        self.settings_manager.save_config(new_config)
+        self.settings_manager.update_config(new_config)
         self.accept()
\ No newline at end of file
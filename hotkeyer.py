@@ -3,6 +3,7 @@ from audio_manager import AudioManager
 from settings_manager import SettingsManager
 from typing import Literal
 from logger_config import logger
+from latency_trace import tracer
 import time
 
 class PhraseDetector:
@@ -10,6 +11,7 @@ class PhraseDetector:
         self.phrase = ""
         self._listening = False
         self._hook = None  # to store the hook for later removal
+        self.trace = None  # latency trace of the last phrase, started at its Enter keypress
         self.audio = AudioManager(SettingsManager())
 
     def _on_key_event(self, event):
@@ -21,6 +23,7 @@ class PhraseDetector:
 
             if name == 'enter':
                 # Stop listener on Enter key, breaking the loop in listen_for_phrase
+                self.trace = tracer.start("auto_tts")
                 self._listening = False
             elif name == 'backspace':
                 self.phrase = self.phrase[:-1]
@@ -35,6 +38,7 @@ class PhraseDetector:
         This is a polling-based implementation to allow interruption from other threads.
         """
         self.phrase = ""
+        self.trace = None
         self._listening = True
         self._hook = keyboard.hook(self._on_key_event)
         logger.info("[HOTKEYER] Phrase detection started.")
@@ -42,6 +46,8 @@ class PhraseDetector:
         while self._listening:
             time.sleep(0.05)  # Poll to prevent high CPU, allows thread to be interrupted
 
+        if self.trace is not None:
+            self.trace.mark("poll")
         keyboard.unhook(self._hook)
         self._hook = None
         
@@ -59,11 +65,19 @@ class PhraseDetector:
     def standalone(self,mode:Literal["effects-only","merged"]='effects-only'):
         """ Mode can be 'effects-only' or 'merged'. Defult: 'effects-only'. """
         self.audio.start_audio_processing(mic_device_id="(Logitech G733 Gamin, MME",output_device_id="CABLE Input (VB-Audio Virtual C")
-        self.audio.mode = mode
+        self.audio.set_mode(mode)
         while True:
-            self.audio.generate_tts_audio(text=detector.listen_for_phrase())
+            phrase = detector.listen_for_phrase()
+            if phrase.startswith("/") and phrase[1:] in self.audio.macros.definitions():
+                self.audio.play_macro(phrase[1:])
+                print(f"Played macro: {phrase[1:]}")
+                continue
+            trace = detector.trace
+            self.audio.generate_tts_audio(text=phrase)
+            if trace is not None:
+                trace.mark("render")
             print(f"Generated TTS for: {detector.phrase}")
-            self.audio.play_generated_tts()
+            self.audio.play_generated_tts(trace)
 
 detector = PhraseDetector()
 
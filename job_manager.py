@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from PyQt6 import QtCore
+from logger_config import logger
+
+
+class JobManager(QtCore.QObject):
+    """
+    Runs blocking audio work (TTS rendering, ffmpeg decoding) off the Qt main thread.
+    Jobs are submitted to named lanes; each lane is its own executor so a long TTS render
+    never holds up a soundboard click. Results come back on the main thread through signals.
+    """
+    job_finished = QtCore.pyqtSignal(str, object)
+    job_failed = QtCore.pyqtSignal(str, str)
+    _job_done = QtCore.pyqtSignal(object, object, object)
+
+    # lane name -> worker count. The TTS lane is serial because renders share the temp file;
+    # the settings lane so config reloads and re-levelling apply in the order they were made.
+    LANES = {"tts": 1, "decode": 4, "settings": 1}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._lanes = {
+            name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-job")
+            for name, workers in self.LANES.items()
+        }
+        self._keyed = {}       # key -> (generation, future)
+        self._pending = {}     # every future not yet done, keyed or not -> its lane
+        self._generation = 0
+        self._cancelled_through = dict.fromkeys(self.LANES, 0)  # per lane, jobs up to this generation were cancelled
+        self._job_done.connect(self._dispatch)
+
+    def submit(self, lane, fn, *args, key=None, on_done=None):
+        """
+        Queues fn(*args) on the given lane and returns its Future.
+        If key is given, a still-pending job with the same key is cancelled (coalesced),
+        and the result of an already-running one is dropped when it completes.
+        on_done(result) is invoked on the main thread.
+        """
+        previous = None
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if key is not None:
+                previous = self._keyed.get(key)
+            future = self._lanes[lane].submit(self._run, lane, key, generation, fn, args)
+            if key is not None:
+                self._keyed[key] = (generation, future)
+            self._pending[future] = lane
+        # Outside the lock: cancel() runs the done callback, which takes it
+        if previous and previous[1].cancel():
+            logger.info(f"Job '{key}' superseded before it started.")
+        future.add_done_callback(lambda f: self._on_future_done(f, lane, key, generation, on_done))
+        return future
+
+    def cancel(self, key):
+        """Cancels the pending job registered under key. A running job finishes but its result is dropped."""
+        with self._lock:
+            entry = self._keyed.pop(key, None)
+        if entry:
+            entry[1].cancel()
+
+    def cancel_all(self, lanes=None):
+        """
+        Cancels every pending job, or only those on the given lanes; jobs already running finish
+        but their results are dropped.
+        """
+        lanes = set(self.LANES if lanes is None else lanes)
+        with self._lock:
+            pending = [future for future, lane in self._pending.items() if lane in lanes]
+            for future in pending:
+                del self._pending[future]
+            self._keyed = {key: entry for key, entry in self._keyed.items() if entry[1] not in pending}
+            for lane in lanes:
+                self._cancelled_through[lane] = self._generation
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        for executor in self._lanes.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _is_current(self, lane, key, generation):
+        with self._lock:
+            if generation <= self._cancelled_through[lane]:
+                return False
+            if key is None:
+                return True
+            entry = self._keyed.get(key)
+            return entry is not None and entry[0] == generation
+
+    def _run(self, lane, key, generation, fn, args):
+        if not self._is_current(lane, key, generation):
+            return None
+        return fn(*args)
+
+    def _on_future_done(self, future, lane, key, generation, on_done):
+        # Runs on the worker thread; hand the outcome to the main thread.
+        with self._lock:
+            self._pending.pop(future, None)
+        if future.cancelled():
+            return
+        stale = not self._is_current(lane, key, generation)
+        if key is not None and not stale:
+            with self._lock:
+                if self._keyed.get(key, (None,))[0] == generation:
+                    del self._keyed[key]
+        if stale:
+            return
+        self._job_done.emit(key, future, on_done)
+
+    @QtCore.pyqtSlot(object, object, object)
+    def _dispatch(self, key, future, on_done):
+        name = key or ""
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Background job '{name}' failed: {error}")
+            self.job_failed.emit(name, str(error))
+            return
+        result = future.result()
+        if on_done:
+            on_done(result)
+        self.job_finished.emit(name, result)
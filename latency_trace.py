@@ -0,0 +1,108 @@
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+from logger_config import logger
+
+# Where the time goes between a trigger (Enter in the hotkeyer, a soundboard click) and the first
+# output sample. A Trace is started at the trigger and marked as it passes each stage; the mixer
+# stamps it when the voice is first mixed into an output block. Finished traces are aggregated
+# per trigger kind into p50/p95/p99 per stage.
+
+HISTORY = 500
+
+
+class Trace:
+    __slots__ = ("kind", "started", "marks", "first_output", "output_delay")
+
+    def __init__(self, kind, started=None):
+        self.kind = kind
+        self.started = time.perf_counter() if started is None else started
+        self.marks = []           # [(stage, perf_counter)] in order
+        self.first_output = None  # set by the audio callback
+        self.output_delay = 0.0   # time from that callback until its block reaches the DAC
+
+    def mark(self, stage):
+        self.marks.append((stage, time.perf_counter()))
+
+    def stages(self):
+        """Returns [(stage, seconds)] where each stage lasts until the next mark."""
+        result = []
+        last = self.started
+        for stage, stamp in self.marks:
+            result.append((stage, stamp - last))
+            last = stamp
+        if self.first_output is not None:
+            result.append(("mixer", self.first_output - last))
+            if self.output_delay:
+                result.append(("output", self.output_delay))
+            result.append(("total", self.first_output + self.output_delay - self.started))
+        return result
+
+
+class LatencyTracer:
+    def __init__(self, history=HISTORY):
+        self._history = history
+        # Filled from any thread, including the audio callback, and only drained by report(); bounded
+        # so a session that never asks for a report does not keep every trace
+        self._finished = deque(maxlen=history)
+        self._samples = {}        # kind -> stage -> deque of seconds
+        self._lock = threading.Lock()
+
+    def start(self, kind, started=None):
+        return Trace(kind, started)
+
+    def first_output(self, trace, output_delay=0.0):
+        """Called from the audio callback the first time a traced voice is mixed. Only stamps and queues."""
+        trace.first_output = time.perf_counter()
+        trace.output_delay = output_delay
+        self._finished.append(trace)
+
+    def finish(self, trace, stage):
+        """Ends a trace that never reaches a local output block (e.g. handed to the engine process)."""
+        trace.mark(stage)
+        self._finished.append(trace)
+
+    def _collect(self):
+        while self._finished:
+            trace = self._finished.popleft()
+            stages = self._samples.setdefault(trace.kind, {})
+            for stage, seconds in trace.stages():
+                stages.setdefault(stage, deque(maxlen=self._history)).append(seconds)
+
+    def report(self):
+        """{kind: {stage: {'count', 'p50_ms', 'p95_ms', 'p99_ms'}}} over the recent history."""
+        with self._lock:
+            self._collect()
+            report = {}
+            for kind, stages in self._samples.items():
+                report[kind] = {}
+                for stage, values in stages.items():
+                    ms = np.asarray(values) * 1000.0
+                    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+                    report[kind][stage] = {'count': len(ms), 'p50_ms': round(float(p50), 2),
+                                           'p95_ms': round(float(p95), 2), 'p99_ms': round(float(p99), 2)}
+        return report
+
+    def format_report(self):
+        lines = []
+        for kind, stages in self.report().items():
+            lines.append(kind)
+            for stage, s in stages.items():
+                lines.append(f"  {stage:<10} p50 {s['p50_ms']:8.1f} ms   p95 {s['p95_ms']:8.1f} ms   "
+                             f"p99 {s['p99_ms']:8.1f} ms   (n={s['count']})")
+        return "\n".join(lines) or "No latency samples yet."
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'generated': time.strftime("%Y-%m-%d %H:%M:%S"), 'latency': self.report()}, f, indent=4)
+        logger.info(f"Latency report written to {path}")
+
+    def clear(self):
+        with self._lock:
+            self._finished.clear()
+            self._samples.clear()
+
+
+tracer = LatencyTracer()
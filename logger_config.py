@@ -1,43 +1,87 @@
 import logging
 import tkinter as tk
 from tkinter.scrolledtext import ScrolledText
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 import os
 import gzip
 import glob
 import time
+import queue
+import atexit
+import threading
+import shutil
+import sys
+import json
+import multiprocessing
 from datetime import datetime, timedelta
 
 LOG_DIR = "logs"
-LOG_BASENAME = "application.log"
+# A spawned child (the audio engine process) gets its own file: two processes rotating the same
+# file would rename it out from under each other. Spawned children are named before this import.
+LOG_BASENAME = "application.log" if multiprocessing.current_process().name == "MainProcess" else "engine.log"
 LOG_PATH = os.path.join(LOG_DIR, LOG_BASENAME)
 ROTATE_WHEN = 'midnight'
 ROTATE_INTERVAL = 1
 LOG_RETENTION_DAYS = 3
+RT_REPORT_INTERVAL = 1.0  # seconds between aggregated audio-thread reports
+COMPRESS_CHUNK_BYTES = 256 * 1024
+PERF_LOG_PATH = os.path.join(LOG_DIR, "performance.jsonl")
 
 os.makedirs(LOG_DIR, exist_ok=True)
 
+class LogHousekeeper:
+    """
+    Background worker for rotated-log housekeeping (compression and retention purging), so a
+    rollover only renames the current file and returns to whichever thread emitted the record.
+    Compression streams in bounded chunks to keep memory flat on large logs.
+    """
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-housekeeping", daemon=True)
+                self._thread.start()
+        self._queue.put((fn, args))
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                # Logging from here could recurse into another rollover; report on stderr instead
+                print(f"Log housekeeping failed: {e}", file=sys.stderr)
+
+housekeeper = LogHousekeeper()
+
 class GzTimedRotatingFileHandler(TimedRotatingFileHandler):
     """Handler that compresses old log files after rotation and purges very old files."""
     def doRollover(self):
         super().doRollover()
+        housekeeper.submit(self._housekeeping)
+
+    def _housekeeping(self):
         self._compress_old_logs()
         self._delete_very_old_logs()
   
     def _compress_old_logs(self):
-        for log_file in glob.glob(os.path.join(LOG_DIR, f"{LOG_BASENAME}.*")):
-            if log_file.endswith('.gz'):
+        for log_file in glob.glob(f"{self.baseFilename}.*"):
+            if log_file.endswith(('.gz', '.gz.tmp')):
                 continue
-            # Compress only if not the current log
-            if not log_file.endswith(LOG_BASENAME):
-                gz_file = log_file + ".gz"
-                with open(log_file, "rb") as f_in, gzip.open(gz_file, "wb") as f_out:
-                    f_out.writelines(f_in)
-                os.remove(log_file)
+            gz_file = log_file + ".gz"
+            tmp_file = gz_file + ".tmp"
+            with open(log_file, "rb") as f_in, gzip.open(tmp_file, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out, COMPRESS_CHUNK_BYTES)
+            os.replace(tmp_file, gz_file)
+            os.remove(log_file)
 
     def _delete_very_old_logs(self):
         now = time.time()
-        for gz_file in glob.glob(os.path.join(LOG_DIR, f"{LOG_BASENAME}.*.gz")):
+        for gz_file in glob.glob(f"{self.baseFilename}.*.gz"):
             # Parse the timestamp from the rotated file name, format: application.log.YYYY-MM-DD
             date_portion = gz_file.split('.')[-2]
             try:
@@ -47,6 +91,79 @@ class GzTimedRotatingFileHandler(TimedRotatingFileHandler):
             if now - log_time > LOG_RETENTION_DAYS * 86400:
                 os.remove(gz_file)
 
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record: the timestamp, the source and the record's perf dict."""
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "source": record.getMessage()}
+        entry.update(getattr(record, "perf", {}))
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+class RealtimeEventLog:
+    """
+    Lets the audio callbacks report stream status flags without touching the logging system.
+    Callbacks only bump preallocated integer counters; a background thread compares them with
+    the previous snapshot once per interval and logs one aggregated line per event kind,
+    e.g. "37 output underflows in the last second (main stream)".
+    """
+    FLAGS = ('input_underflow', 'input_overflow', 'output_underflow', 'output_overflow', 'priming_output')
+
+    def __init__(self, logger, sources=('main', 'preview'), interval=RT_REPORT_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self._counters = {}
+        self._reported = {}
+        for source in sources:
+            self.register_source(source)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register_source(self, source):
+        # Outputs register while the rt-log thread iterates; replace the dict instead of growing it
+        if source not in self._counters:
+            self._reported[source] = [0] * len(self.FLAGS)
+            self._counters = {**self._counters, source: [0] * len(self.FLAGS)}
+
+    def record_status(self, source, status):
+        """Called from audio callbacks with their sd.CallbackFlags. Never blocks or allocates."""
+        counters = self._counters.get(source)
+        if counters is None:
+            return
+        for i, flag in enumerate(self.FLAGS):
+            if getattr(status, flag, False):
+                counters[i] += 1
+
+    def totals(self):
+        return {source: dict(zip(self.FLAGS, counts)) for source, counts in self._counters.items()}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rt-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._report()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._report()
+
+    def _report(self):
+        period = "second" if self.interval == 1.0 else f"{self.interval:g} seconds"
+        for source, counters in self._counters.items():
+            reported = self._reported[source]
+            for i, flag in enumerate(self.FLAGS):
+                current = counters[i]
+                delta = current - reported[i]
+                if delta:
+                    reported[i] = current
+                    label = flag.replace('_', ' ')
+                    self.logger.warning(f"{delta} {label}{'s' if delta != 1 else ''} in the last {period} ({source} stream)")
+
+
 def setup_logger():
     logger = logging.getLogger("AppLogger")
     logger.setLevel(logging.INFO)
@@ -59,7 +176,75 @@ def setup_logger():
     )
     fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     handler.setFormatter(fmt)
-    logger.addHandler(handler)
+    # Callers only enqueue records; formatting-to-disk and rotation happen on the listener thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+class PerfLog:
+    """
+    Optional structured performance channel. Registered sources (callables returning a dict,
+    e.g. AudioManager.get_stats) are sampled every interval on a background thread and written
+    as JSON lines to logs/performance.jsonl, through its own queue and rotating handler.
+    """
+    def __init__(self):
+        self.logger = logging.getLogger("AppLogger.perf")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._sources = {}
+        self._listener = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.interval = 5.0
+
+    def register_source(self, name, fn):
+        self._sources[name] = fn
+
+    def enable(self, interval=5.0, path=PERF_LOG_PATH):
+        if self._listener is not None:
+            return
+        self.interval = interval
+        handler = GzTimedRotatingFileHandler(
+            path,
+            when=ROTATE_WHEN,
+            interval=ROTATE_INTERVAL,
+            backupCount=LOG_RETENTION_DAYS,
+            encoding='utf-8'
+        )
+        handler.setFormatter(JsonLinesFormatter())
+        perf_queue = queue.SimpleQueue()
+        self.logger.addHandler(QueueHandler(perf_queue))
+        self._listener = QueueListener(perf_queue, handler)
+        self._listener.start()
+        self._thread = threading.Thread(target=self._run, name="perf-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.disable)
+
+    def disable(self):
+        if self._listener is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._listener.stop()
+        self._listener = None
+
+    def log(self, source, stats):
+        if self._listener is not None:
+            self.logger.info(source, extra={"perf": stats})
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name, fn in list(self._sources.items()):
+                try:
+                    self.log(name, fn())
+                except Exception as e:
+                    logger.error(f"Perf source '{name}' failed: {e}")
+
+logger = setup_logger()
+rt_events = RealtimeEventLog(logger)
+rt_events.start()
+atexit.register(rt_events.stop)
+perf_log = PerfLog()
\ No newline at end of file
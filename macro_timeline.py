@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import numpy as np
+from logger_config import logger
+from sample_store import from_float, to_float
+
+
+class MacroLibrary:
+    """
+    Named sequences of sound effects, TTS lines and gaps from the "macros" config key, e.g.
+
+        "macros": {
+            "gotcha": [
+                {"effect": "boom.ogg"},
+                {"gap_ms": 150},
+                {"tts": "gotcha", "character": "sans"}
+            ]
+        }
+
+    Each macro is rendered once into a single sample buffer and played as one voice. The cache
+    entry remembers what it was rendered from (the steps, the audio settings and the modification
+    times of the files involved) and is rendered again when any of that changes.
+    """
+
+    def __init__(self, audio_manager):
+        self.audio = audio_manager
+        self._lock = threading.Lock()
+        self._cache = {}  # name -> (key, buffer), least recently used first
+
+    def definitions(self):
+        return self.audio.settings.get("macros") or {}
+
+    def names(self):
+        return sorted(self.definitions())
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _inputs_key(self, steps):
+        audio = self.audio
+        files = []
+        for step in steps:
+            if "effect" in step:
+                files.append(audio._resolve_sound_path(step["effect"]))
+            elif "tts" in step:
+                tone = audio.find_speaktone_file(step["character"]) if step.get("character") else \
+                    audio.settings.get("speaktone_file")
+                if tone:
+                    files.append(os.path.join(audio.sound_effects_path, tone))
+        mtimes = [os.path.getmtime(f) if os.path.exists(f) else None for f in files]
+        variation = [audio.settings.get(k) for k in ("tts_pitch_variation_semitones", "tts_speed_variation",
+                                                     "tts_variant_count", "tts_voice_variation")]
+        return json.dumps([steps, audio.sample_rate, audio.effects_volume_db, audio.store_dtype,
+                           audio.tts_pause_ms, variation, files, mtimes], sort_keys=True, default=str)
+
+    def render(self, name):
+        """Returns the rendered buffer for a macro, from the cache when its inputs are unchanged."""
+        steps = self.definitions().get(name)
+        if steps is None:
+            raise KeyError(f"unknown macro '{name}'")
+        key = self._inputs_key(steps)
+        with self._lock:
+            cached = self._cache.pop(name, None)
+            if cached is not None and cached[0] == key:
+                self._cache[name] = cached
+                return cached[1]
+        buffer = self._render_steps(steps)
+        with self._lock:
+            self._cache[name] = (key, buffer)
+        self.audio.memory.enforce()
+        logger.info(f"Rendered macro '{name}' ({buffer['data'].shape[0] / self.audio.sample_rate:.2f}s).")
+        return buffer
+
+    def _render_steps(self, steps):
+        audio = self.audio
+        pieces = []
+        for step in steps:
+            if "effect" in step:
+                piece = to_float(audio.load_sound_effect(step["effect"]))
+            elif "tts" in step:
+                tone = audio.find_speaktone_file(step["character"]) if step.get("character") else None
+                if step.get("character") and tone is None:
+                    raise ValueError(f"unknown character '{step['character']}'")
+                rendered = audio.generate_tts_samples(step["tts"], tone)
+                piece = to_float(rendered) if rendered is not None else None
+            elif "gap_ms" in step:
+                piece = np.zeros((int(audio.sample_rate * step["gap_ms"] / 1000), 2), dtype=np.float32)
+            else:
+                raise ValueError(f"unknown macro step {step}")
+            if piece is not None and len(piece):
+                pieces.append(piece)
+        if not pieces:
+            return from_float(np.zeros((0, 2), dtype=np.float32), audio.store_dtype)
+        # Every piece is already levelled like it would be when played on its own
+        return from_float(np.concatenate(pieces), audio.store_dtype)
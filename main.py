@@ -1,9 +1,12 @@
 import sys
 from PyQt6 import QtWidgets, QtGui
 from gui_manager import CustomWindow
+from asset_pack import assets
 from audio_manager import AudioManager
 from settings_manager import SettingsManager
-from logger_config import logger
+from control_server import ControlServer
+from engine_process import ProcessAudioEngine
+from logger_config import logger, perf_log
 
 def main():
     logger.info("Starting Application with PyQt6 UI...")
@@ -11,21 +14,42 @@ def main():
     try:
         app = QtWidgets.QApplication(sys.argv)
 
-        # Load custom font after QApplication is created
-        font_id = QtGui.QFontDatabase.addApplicationFont("assets/determination.ttf")
-        if font_id != -1:
-            family = QtGui.QFontDatabase.applicationFontFamilies(font_id)[0]
+        # Load custom font after QApplication is created, from the same asset pack as the images
+        family = assets.font_family("determination.ttf")
+        if family is not None:
             app_font = QtGui.QFont(family)
             app.setFont(app_font)
         else:
             print("Failed to load custom font.")
 
         settings_manager = SettingsManager()
-        audio_manager = AudioManager(settings_manager)
+        if settings_manager.get("engine_mode") == "process":
+            audio_manager = ProcessAudioEngine(settings_manager)
+        else:
+            audio_manager = AudioManager(settings_manager)
+
+        if settings_manager.get("perf_log_enabled"):
+            perf_log.register_source("audio", audio_manager.get_stats)
+            perf_log.enable(interval=settings_manager.get("perf_log_interval_s"))
+
+        control_server = None
+        if settings_manager.get("control_server_enabled"):
+            control_server = ControlServer(
+                audio_manager,
+                host=settings_manager.get("control_server_host"),
+                port=settings_manager.get("control_server_port"),
+                socket_path=settings_manager.get("control_server_socket") or None
+            )
+            control_server.start()
 
         window = CustomWindow(audio_manager, settings_manager)
         window.show()
-        sys.exit(app.exec())
+        exit_code = app.exec()
+        if control_server:
+            control_server.stop()
+        if isinstance(audio_manager, ProcessAudioEngine):
+            audio_manager.shutdown()
+        sys.exit(exit_code)
 
     except Exception as e:
         logger.critical(f"An unhandled exception occurred: {e}", exc_info=True)
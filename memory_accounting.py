@@ -0,0 +1,113 @@
+import tracemalloc
+from logger_config import logger
+
+# Where DeltaToner's memory goes, per subsystem, and optional caps that evict from the caches.
+# Limits come from the "memory_limits_mb" config key, e.g.
+#     {"effect_cache": 256, "macro_cache": 64, "tone_banks": 64, "total": 512}
+# Only the caches can be evicted (oldest entry first); a "total" limit evicts effects first,
+# then macros, then tone banks that are not the active voice. Playing voices are never touched.
+
+MB = 1024 * 1024
+EVICTION_ORDER = ("effect_cache", "macro_cache", "tone_banks")
+
+
+def entry_nbytes(value):
+    """Sums the sample data held by a cache entry: a buffer, or tuples/lists containing buffers."""
+    if isinstance(value, dict):
+        data = value.get('data')
+        return 0 if data is None else data.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(entry_nbytes(v) for v in value)
+    return 0
+
+
+class MemoryMonitor:
+    def __init__(self, audio_manager):
+        self.audio = audio_manager
+        self.evicted = {name: 0 for name in EVICTION_ORDER}
+
+    def _caches(self):
+        """name -> (dict ordered oldest first, lock guarding it)."""
+        audio = self.audio
+        return {
+            'effect_cache': (audio._effect_cache, audio.lock),
+            'macro_cache': (audio.macros._cache, audio.macros._lock),
+            'tone_banks': (audio._tone_banks, audio.lock),
+        }
+
+    def usage(self):
+        """Bytes held per subsystem, plus 'total'."""
+        audio = self.audio
+        voices = 0
+        for effect in list(audio.active_effects):
+            voices += effect['stream'].nbytes if 'stream' in effect else entry_nbytes(effect['buffer'])
+        voices += sum(entry_nbytes(buffer) for _, _, buffer in list(audio._scheduled))
+        usage = {'voice_pool': voices}
+        for name, (cache, lock) in self._caches().items():
+            with lock:
+                usage[name] = sum(entry_nbytes(v) for v in cache.values())
+        usage['tone_banks'] += entry_nbytes((audio.speak_tone, audio.variated_speak_tones))
+        usage['output_buffers'] = audio._scratch.nbytes + sum(ring.nbytes for ring in audio._output_rings.values())
+        recorder = audio.recorder
+        usage['recorder'] = recorder._ring.nbytes if recorder is not None else 0
+        usage['total'] = sum(usage.values())
+        return usage
+
+    def limits(self):
+        limits = self.audio.settings.get("memory_limits_mb") or {}
+        return {name: int(mb * MB) for name, mb in limits.items() if mb}
+
+    def enforce(self):
+        """Evicts oldest cache entries until every configured limit holds. Returns bytes freed."""
+        limits = self.limits()
+        if not limits:
+            return 0
+        freed = 0
+        caches = self._caches()
+        usage = self.usage()
+        for name in EVICTION_ORDER:
+            if name in limits:
+                freed += self._evict(name, caches[name], usage, usage[name] - limits[name])
+        if 'total' in limits:
+            for name in EVICTION_ORDER:
+                excess = usage['total'] - limits['total']
+                if excess <= 0:
+                    break
+                freed += self._evict(name, caches[name], usage, excess)
+        if freed:
+            logger.info(f"Memory limits evicted {freed / MB:.1f} MB from caches.")
+        return freed
+
+    def _evict(self, name, cache_and_lock, usage, excess):
+        cache, lock = cache_and_lock
+        freed = 0
+        with lock:
+            while excess > freed and cache:
+                key = next(iter(cache))
+                freed += entry_nbytes(cache.pop(key))
+        usage[name] -= freed
+        usage['total'] -= freed
+        self.evicted[name] += freed
+        return freed
+
+    def report(self, snapshot=False, top=15):
+        """Usage and limits in bytes; with snapshot=True also the top tracemalloc allocation sites."""
+        report = {'usage': self.usage(), 'limits': self.limits(), 'evicted': dict(self.evicted)}
+        if snapshot:
+            report['tracemalloc'] = self.snapshot(top)
+        return report
+
+    def snapshot(self, top=15):
+        """
+        Top allocation sites by size. tracemalloc is started on the first call (it slows Python
+        allocations down, so it stays off until someone asks); that call only reports that it started.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            return ["tracemalloc started; request another snapshot to see allocations."]
+        stats = tracemalloc.take_snapshot().statistics("lineno")
+        return [f"{stat.size / 1024:.1f} KiB in {stat.count} blocks: {stat.traceback}" for stat in stats[:top]]
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
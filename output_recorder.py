@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import wave
+import numpy as np
+from logger_config import logger
+
+try:
+    import soundfile as sf
+except ImportError:  # optional, WAV recording works without it
+    sf = None
+
+WRITE_CHUNK_SECONDS = 0.5
+
+
+class OutputRecorder:
+    """
+    Records the mixed main output to a WAV or FLAC file. The audio callback only copies each
+    block into a preallocated float32 ring; a writer thread empties the ring to disk in large
+    sequential writes. Like StreamingSource, the ring is single-producer (callback) /
+    single-consumer (writer) and each side only advances its own position. If the disk falls
+    behind and the ring is full, the block is dropped and counted instead of blocking the callback.
+    """
+
+    def __init__(self, path, sample_rate, channels=2, ring_seconds=8.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._ring = np.zeros((int(ring_seconds * sample_rate), channels), dtype=np.float32)
+        self._capacity = self._ring.shape[0]
+        self._write_pos = 0   # advanced by the callback
+        self._read_pos = 0    # advanced by the writer thread
+        self._closing = False
+        self.dropped_blocks = 0
+        self.dropped_frames = 0
+        self.error = None
+        self._file = self._open(path)
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def _open(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if sf is not None:
+            return sf.SoundFile(path, "w", samplerate=self.sample_rate, channels=self.channels, subtype="PCM_16")
+        if os.path.splitext(path)[1].lower() != ".wav":
+            raise ValueError("recording to anything but WAV needs the soundfile package")
+        f = wave.open(path, "wb")
+        f.setnchannels(self.channels)
+        f.setsampwidth(2)
+        f.setframerate(self.sample_rate)
+        return f
+
+    # --- audio thread side ---
+    def write(self, block):
+        if self._closing:
+            return
+        n = block.shape[0]
+        if self._capacity - (self._write_pos - self._read_pos) < n:
+            self.dropped_blocks += 1
+            self.dropped_frames += n
+            return
+        start = self._write_pos % self._capacity
+        first = min(n, self._capacity - start)
+        self._ring[start:start + first] = block[:first]
+        if first < n:
+            self._ring[:n - first] = block[first:]
+        self._write_pos += n
+
+    # --- control side ---
+    @property
+    def seconds(self):
+        return self._read_pos / self.sample_rate
+
+    def close(self):
+        """Stops recording, flushes what is buffered and closes the file."""
+        self._closing = True
+        self._thread.join(timeout=5)
+        if self.dropped_blocks:
+            logger.warning(f"Recording {self.path} dropped {self.dropped_blocks} blocks ({self.dropped_frames} frames).")
+        logger.info(f"Recording saved to {self.path} ({self.seconds:.1f}s).")
+
+    # --- writer thread ---
+    def _run(self):
+        chunk = int(WRITE_CHUNK_SECONDS * self.sample_rate)
+        try:
+            while True:
+                closing = self._closing
+                available = self._write_pos - self._read_pos
+                if available >= chunk or (closing and available > 0):
+                    self._flush(min(available, chunk))
+                    continue
+                if closing:
+                    break
+                time.sleep(WRITE_CHUNK_SECONDS / 4)
+        except Exception as e:
+            self.error = str(e)
+            self._closing = True
+            logger.error(f"Recording to {self.path} failed: {e}")
+        finally:
+            self._file.close()
+
+    def _flush(self, n):
+        start = self._read_pos % self._capacity
+        first = min(n, self._capacity - start)
+        data = self._ring[start:start + first]
+        if first < n:
+            data = np.concatenate((data, self._ring[:n - first]))
+        if sf is not None:
+            self._file.write(data)
+        else:
+            pcm = np.rint(np.clip(data, -1.0, 1.0) * 32767).astype(np.int16)
+            self._file.writeframes(pcm.tobytes())
+        self._read_pos += n
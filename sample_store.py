@@ -0,0 +1,88 @@
+import numpy as np
+from audio_dsp import db_to_gain
+
+# Compact in-memory representation for decoded audio (effects, speak tones, rendered TTS).
+# A sample buffer is a dict:
+#     'data':  (frames, channels) int16 or float16 array in the source's own channel count
+#     'scale': float32 factor that turns 'data' into float samples at the target level
+# Level normalization and int16 full-scale are folded into 'scale' instead of being baked into
+# the samples, and mono stays mono: the mixer converts and upmixes only the current block.
+
+STORE_DTYPES = {"int16": np.int16, "float16": np.float16}
+
+
+def buffer_frames(buffer):
+    return 0 if buffer is None else buffer['data'].shape[0]
+
+
+def buffer_nbytes(buffer):
+    return 0 if buffer is None else buffer['data'].nbytes
+
+
+def from_decoded(pcm, volume_db=None, store_dtype="int16"):
+    """Builds a buffer from (frames, channels) int16 PCM, levelled to volume_db (dBFS) if given."""
+    scale = 1.0 / 32768.0
+    if volume_db is not None:
+        scale *= level_gain(pcm, volume_db)
+    return from_pcm16(pcm, scale, store_dtype)
+
+
+def level_gain(pcm, volume_db):
+    """Linear gain that brings int16 PCM to volume_db (dBFS); 1.0 for silence."""
+    if not pcm.size:
+        return 1.0
+    # Same measure as pydub's dBFS: RMS over all samples relative to int16 full scale
+    rms = np.sqrt(np.mean(np.square(pcm, dtype=np.float64)))
+    if rms == 0:
+        return 1.0
+    return db_to_gain(volume_db - 20 * np.log10(rms / 32768.0))
+
+
+def from_pcm16(pcm, scale, store_dtype="int16"):
+    if store_dtype == "float16":
+        return {'data': (pcm.astype(np.float32) * scale).astype(np.float16), 'scale': np.float32(1.0)}
+    return {'data': np.ascontiguousarray(pcm, dtype=np.int16), 'scale': np.float32(scale)}
+
+
+def from_float(samples, store_dtype="int16"):
+    """Compacts a float32 (frames, channels) buffer, e.g. freshly rendered TTS."""
+    if store_dtype == "float16":
+        return {'data': samples.astype(np.float16), 'scale': np.float32(1.0)}
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak == 0.0:
+        return {'data': np.zeros(samples.shape, dtype=np.int16), 'scale': np.float32(0.0)}
+    # Use the full int16 range for this buffer; the peak level is restored through scale
+    pcm = np.rint(samples * (32767.0 / peak)).astype(np.int16)
+    return {'data': pcm, 'scale': np.float32(peak / 32767.0)}
+
+
+def silence(frames, store_dtype="int16"):
+    return {'data': np.zeros((frames, 1), dtype=STORE_DTYPES[store_dtype]), 'scale': np.float32(0.0)}
+
+
+def to_float(buffer, channels=2):
+    """Expands a whole buffer to float32 with the given channel count. Not for the audio thread."""
+    data = buffer['data'].astype(np.float32) * buffer['scale']
+    if data.shape[1] != channels:
+        data = np.broadcast_to(data[:, :1], (data.shape[0], channels)).copy()
+    return data
+
+
+def mix_into(out, buffer, pos, gain, scratch):
+    """
+    Adds buffer['data'][pos:pos + len(out)] * gain into out (float32, frames x 2) and returns the
+    number of frames mixed. scratch is a preallocated float32 array at least as large as out;
+    mono sources broadcast across both output channels, and anything past the second channel is
+    dropped (decode() already downmixes, this only keeps a stray buffer out of the callback).
+    """
+    chunk = buffer['data'][pos:pos + out.shape[0]]
+    n, channels = chunk.shape
+    if n == 0:
+        return 0
+    if channels > 2:
+        chunk = chunk[:, :2]
+        channels = 2
+    tmp = scratch[:n, :channels]
+    np.multiply(chunk, np.float32(buffer['scale'] * gain), out=tmp)
+    out[:n] += tmp
+    return n
@@ -1,11 +1,14 @@
 import os
 import json
+import threading
 from default_config import get_default_config
 
 CONFIG_FILE = "config.json"
 
 class SettingsManager:
     def __init__(self):
+        # The GUI and the latency tuner's thread both save; hold this around any read-modify-write
+        self.lock = threading.RLock()
         self.config = self.load_config()
 
     def load_config(self):
@@ -25,12 +28,20 @@ class SettingsManager:
             return get_default_config()
 
     def save_config(self, config_data):
-        self.config = config_data.copy()
-        try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(config_data, f, indent=4)
-        except IOError as e:
-            print(f"Could not write to '{CONFIG_FILE}': {e}")
+        with self.lock:
+            self.config = config_data.copy()
+            try:
+                with open(CONFIG_FILE, 'w') as f:
+                    json.dump(config_data, f, indent=4)
+            except IOError as e:
+                print(f"Could not write to '{CONFIG_FILE}': {e}")
+
+    def update_config(self, changes):
+        """Saves the given keys on top of the current config, leaving every other key as it is now."""
+        with self.lock:
+            config = self.config.copy()
+            config.update(changes)
+            self.save_config(config)
 
     def get(self, key):
         return self.config.get(key, get_default_config().get(key))
\ No newline at end of file
@@ -0,0 +1,123 @@
+import threading
+import time
+from logger_config import logger, rt_events
+
+# (blocksize, latency) steps for the main and preview streams, from most to least aggressive.
+# Step 0 is what the streams always used: let PortAudio pick the block size, host API "low" latency.
+LATENCY_STEPS = (
+    (0, 'low'),
+    (256, 0.010),
+    (512, 0.020),
+    (1024, 0.040),
+    (2048, 0.080),
+    (4096, 'high'),
+)
+DROPOUT_FLAGS = ('input_underflow', 'input_overflow', 'output_underflow', 'output_overflow')
+
+
+class LatencyTuner:
+    """
+    Watches the running streams and moves them along LATENCY_STEPS. Any underflow/overflow, or a
+    callback that used more than max_load of its block's time, steps up (larger buffers) right
+    away. After stable_seconds without trouble it tries one step lower again; every time a step has
+    glitched, the wait before trying it again doubles, so a machine settles on its lowest
+    glitch-free step instead of bouncing. The settled step is persisted per device pair through
+    SettingsManager, so the next start begins there.
+    """
+
+    def __init__(self, audio_manager, interval=1.0, stable_seconds=60.0, max_load=0.8):
+        self.audio = audio_manager
+        self.interval = interval
+        self.stable_seconds = stable_seconds
+        self.max_load = max_load
+        self.step = 0
+        self.failures = [0] * len(LATENCY_STEPS)  # dropouts seen while running at each step
+        self.pair_key = None
+        self.changes = 0
+        self._last_dropouts = 0
+        self._stable_since = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- persistence ---
+    @staticmethod
+    def saved_steps(settings):
+        return settings.get("stream_tuning") or {}
+
+    def load(self, pair_key):
+        """Returns the persisted step for a device pair (0 if none) and remembers the pair."""
+        self.pair_key = pair_key
+        saved = self.saved_steps(self.audio.settings).get(pair_key, {})
+        self.step = min(int(saved.get("step", 0)), len(LATENCY_STEPS) - 1)
+        self.failures = [0] * len(LATENCY_STEPS)
+        return self.step
+
+    def _save(self):
+        settings = self.audio.settings
+        blocksize, latency = LATENCY_STEPS[self.step]
+        with settings.lock:
+            tuning = dict(self.saved_steps(settings))
+            tuning[self.pair_key] = {"step": self.step, "blocksize": blocksize, "latency": latency}
+            settings.update_config({"stream_tuning": tuning})
+
+    # --- monitoring ---
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._last_dropouts = self._dropouts()
+        self._stable_since = time.monotonic()
+        self.audio.peak_callback_load = 0.0
+        self._thread = threading.Thread(target=self._run, name="latency-tuner", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _dropouts(self):
+        return sum(counts[flag] for counts in rt_events.totals().values() for flag in DROPOUT_FLAGS)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._check()
+            except Exception as e:
+                logger.error(f"Latency tuner check failed: {e}")
+
+    def _check(self):
+        dropouts = self._dropouts()
+        new_dropouts = dropouts - self._last_dropouts
+        self._last_dropouts = dropouts
+        load, self.audio.peak_callback_load = self.audio.peak_callback_load, 0.0
+        now = time.monotonic()
+        if new_dropouts or load > self.max_load:
+            self.failures[self.step] += 1
+            if self.step + 1 < len(LATENCY_STEPS):
+                reason = f"{new_dropouts} dropouts" if new_dropouts else f"callback load {load:.0%}"
+                self._apply(self.step + 1, reason)
+            self._stable_since = now
+        elif self.step > 0:
+            wait = self.stable_seconds * 2 ** min(self.failures[self.step - 1], 6)
+            if now - self._stable_since >= wait:
+                self._stable_since = now
+                self._apply(self.step - 1, f"stable for {wait:g}s")
+
+    def _apply(self, step, reason):
+        blocksize, latency = LATENCY_STEPS[step]
+        logger.info(f"Latency tuner: step {self.step} -> {step} (blocksize={blocksize}, latency={latency}), {reason}.")
+        if not self.audio.reconfigure_streams(blocksize, latency):
+            return
+        self.step = step
+        self.changes += 1
+        # Fresh counters for the new buffers so the switch itself is not counted against them
+        self._last_dropouts = self._dropouts()
+        self.audio.peak_callback_load = 0.0
+        if self.pair_key:
+            self._save()
+
+    def stats(self):
+        blocksize, latency = LATENCY_STEPS[self.step]
+        return {'step': self.step, 'blocksize': blocksize, 'latency': latency, 'changes': self.changes}
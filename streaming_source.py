@@ -0,0 +1,240 @@
+import os
+import subprocess
+import threading
+import time
+import numpy as np
+from audio_decoder import downmix, probe_duration
+from logger_config import logger
+from sample_store import level_gain
+
+try:
+    import soundfile as sf
+except ImportError:  # optional, ffmpeg handles everything without it
+    sf = None
+
+SOUNDFILE_EXTENSIONS = (".wav", ".ogg", ".flac")
+READ_CHUNK_FRAMES = 4096
+LEVEL_SECONDS = 1.0  # decoded before playback starts and measured to level the whole file
+
+
+class StreamingSource:
+    """
+    Voice for long files (music beds, ambience loops). A background thread decodes the file
+    incrementally into a bounded int16 ring buffer and the mixer consumes it block by block,
+    so playback starts after the first chunk and memory does not depend on duration.
+
+    Decoding uses soundfile when it is installed and the file is already at the stream rate,
+    otherwise a persistent ffmpeg pipe that also resamples. Supports looping and seeking.
+    With volume_db, the file is levelled like decoded effects, but from the RMS of its first
+    LEVEL_SECONDS only: playback waits for those to be decoded, which is far cheaper than a
+    full pass over the file.
+    The ring is single-producer (decoder thread) / single-consumer (audio callback): each side
+    only advances its own position, so neither ever takes a lock.
+    """
+
+    def __init__(self, path, sample_rate, loop=False, start_seconds=0.0, ring_seconds=4.0, channels=2,
+                 volume_db=None):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.loop = loop
+        self.channels = channels
+        self.scale = np.float32(1.0 / 32768.0)
+        self._ring = np.zeros((int(ring_seconds * sample_rate), channels), dtype=np.int16)
+        self._capacity = self._ring.shape[0]
+        self._volume_db = volume_db
+        self._level_frames = min(int(LEVEL_SECONDS * sample_rate), self._capacity) if volume_db is not None else 1
+        self._write_pos = 0
+        self._read_pos = 0
+        self._seek_from = 0          # write position where data after the last seek starts
+        self._seek_request = None
+        self._eof = False
+        self._closed = False
+        self.finished = False
+        self.underruns = 0
+        self.frames_played = 0
+        self._first_data = threading.Event()
+        self._start_seconds = start_seconds
+        self._thread = threading.Thread(target=self._run, name="stream-decode", daemon=True)
+        self._thread.start()
+
+    # --- control side ---
+    def wait_ready(self, timeout=0.5):
+        return self._first_data.wait(timeout)
+
+    def seek(self, seconds):
+        self._seek_request = max(0.0, float(seconds))
+
+    def close(self):
+        self._closed = True
+
+    @property
+    def nbytes(self):
+        return self._ring.nbytes
+
+    # --- audio thread side ---
+    def mix_into(self, out, gain, scratch):
+        """Adds up to len(out) frames into out. Missing data (decoder behind) plays as silence."""
+        if self._closed:
+            self.finished = True
+            return 0
+        if not self._first_data.is_set():
+            return 0  # still measuring the level
+        if self._read_pos < self._seek_from:
+            self._read_pos = self._seek_from  # drop audio decoded before a seek
+        available = self._write_pos - self._read_pos
+        frames = out.shape[0]
+        n = min(frames, available)
+        if n > 0:
+            start = self._read_pos % self._capacity
+            first = min(n, self._capacity - start)
+            tmp = scratch[:n, :self.channels]
+            np.multiply(self._ring[start:start + first], self.scale * gain, out=tmp[:first])
+            if first < n:
+                np.multiply(self._ring[:n - first], self.scale * gain, out=tmp[first:n])
+            out[:n] += tmp
+            self._read_pos += n
+            self.frames_played += n
+        if n < frames:
+            if self._eof and self._seek_request is None and self._write_pos == self._read_pos:
+                self.finished = True
+            elif self._first_data.is_set():
+                self.underruns += 1
+        return n
+
+    # --- decoder thread ---
+    def _run(self):
+        position = self._start_seconds
+        try:
+            while not self._closed:
+                reader = self._open_reader(position)
+                try:
+                    seeked = self._pump(reader)
+                finally:
+                    reader.close()
+                if self._closed:
+                    break
+                if seeked is not None:
+                    position = seeked
+                    continue
+                if not self.loop:
+                    break
+                position = 0.0
+        except Exception as e:
+            logger.error(f"Streaming decode failed for {self.path}: {e}")
+        finally:
+            self._eof = True
+            self._mark_ready()
+
+    def _mark_ready(self):
+        """Sets the level from what has been decoded so far and lets the mixer start reading."""
+        if self._first_data.is_set():
+            return
+        if self._volume_db is not None and self._write_pos:
+            measured = self._ring[:min(self._write_pos, self._capacity)]
+            self.scale = np.float32(level_gain(measured, self._volume_db) / 32768.0)
+        self._first_data.set()
+
+    def _pump(self, reader):
+        """Copies decoded chunks into the ring until EOF, close, or a seek (returns its target)."""
+        while not self._closed:
+            if self._seek_request is not None:
+                target, self._seek_request = self._seek_request, None
+                self._seek_from = self._write_pos
+                return target
+            # After a seek the reader skips to _seek_from before it reads, so the old frames do not count
+            free = self._capacity - (self._write_pos - max(self._read_pos, self._seek_from))
+            if free < READ_CHUNK_FRAMES:
+                time.sleep(0.01)
+                continue
+            chunk = reader.read(READ_CHUNK_FRAMES)
+            if chunk is None or len(chunk) == 0:
+                return None
+            n = len(chunk)
+            start = self._write_pos % self._capacity
+            first = min(n, self._capacity - start)
+            self._ring[start:start + first] = chunk[:first]
+            if first < n:
+                self._ring[:n - first] = chunk[first:]
+            self._write_pos += n
+            if self._write_pos >= self._level_frames:
+                self._mark_ready()
+        return None
+
+    def _open_reader(self, position):
+        if sf is not None and self.path.lower().endswith(SOUNDFILE_EXTENSIONS):
+            try:
+                info = sf.info(self.path)
+                if info.samplerate == self.sample_rate:
+                    return _SoundFileReader(self.path, position, self.channels)
+            except Exception:
+                pass
+        return _FfmpegReader(self.path, position, self.sample_rate, self.channels)
+
+
+class _SoundFileReader:
+    def __init__(self, path, position, channels):
+        self._file = sf.SoundFile(path)
+        self._channels = channels
+        if position:
+            self._file.seek(int(position * self._file.samplerate))
+
+    def read(self, frames):
+        data = self._file.read(frames, dtype='int16', always_2d=True)
+        if data.shape[1] > 2:
+            data = downmix(data)
+        if data.shape[1] != self._channels:
+            data = np.repeat(data[:, :1], self._channels, axis=1)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+class _FfmpegReader:
+    def __init__(self, path, position, sample_rate, channels):
+        self._channels = channels
+        self._frame_bytes = 2 * channels
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+        if position:
+            cmd += ["-ss", f"{position:.3f}"]
+        cmd += ["-i", path, "-f", "s16le", "-acodec", "pcm_s16le",
+                "-ac", str(channels), "-ar", str(sample_rate), "-"]
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      creationflags=creationflags)
+        self._pending = b""
+
+    def read(self, frames):
+        wanted = frames * self._frame_bytes
+        data = self._pending + self._proc.stdout.read(wanted - len(self._pending))
+        usable = len(data) - len(data) % self._frame_bytes
+        self._pending = data[usable:]
+        return np.frombuffer(data[:usable], dtype=np.int16).reshape((-1, self._channels))
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.stdout.close()
+        self._proc.wait()
+
+
+_durations = {}  # (path, mtime) -> seconds, so repeated triggers do not probe again
+
+
+def should_stream(path, min_seconds):
+    """
+    True for files at least min_seconds long. Decided by duration rather than file size: a
+    compressed file says little about how much memory its decoded PCM will take.
+    """
+    if min_seconds <= 0:
+        return False
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return False
+    duration = _durations.get(key)
+    if duration is None:
+        if len(_durations) > 1024:
+            _durations.clear()
+        duration = _durations[key] = probe_duration(path) or 0.0
+    return duration >= min_seconds
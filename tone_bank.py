@@ -0,0 +1,197 @@
+import os
+import re
+import random
+import zlib
+import numpy as np
+from logger_config import logger
+from audio_dsp import db_to_gain
+from sample_store import from_decoded, from_float, silence, to_float
+from audio_decoder import decode
+
+# Loading and rendering of character voice banks. Kept free of Qt and sounddevice so it can
+# be used by the GUI's AudioManager as well as headless tools such as batch_tts.
+
+VSPEAK_PATTERN = re.compile(r"^(.*)--VSpeakTone\d+\.(ogg|wav|mp3)$", re.IGNORECASE)
+SPEAK_PATTERN = re.compile(r"^(.*)-SpeakTone\.(ogg|wav|mp3)$", re.IGNORECASE)
+
+
+def find_speaktone_file(tones_path, character):
+    """Resolves a character name (e.g. 'sans', 'tenna') or a tone filename to a SpeakTone file."""
+    if not character or not os.path.exists(tones_path):
+        return None
+    files = sorted(os.listdir(tones_path))
+    if character in files:
+        return character
+    pattern = re.compile(rf"^{re.escape(character)}(-SpeakTone|--VSpeakTone\d+)\.(ogg|wav|mp3)$", re.IGNORECASE)
+    return next((f for f in files if pattern.match(f)), None)
+
+
+def character_name(speaktone_file):
+    """'sans-SpeakTone.ogg' -> 'sans', 'tenna--VSpeakTone1.ogg' -> 'tenna'."""
+    match = VSPEAK_PATTERN.match(speaktone_file or "") or SPEAK_PATTERN.match(speaktone_file or "")
+    return match.group(1).lower() if match else None
+
+
+def voice_variation(settings, speaktone_file):
+    """
+    Pitch/speed variation for a voice: the global tts_* settings with the character's entry in
+    tts_voice_variation on top. Returns None when the voice has no variation.
+    """
+    variation = {
+        "pitch_semitones": settings.get("tts_pitch_variation_semitones") or 0.0,
+        "speed": settings.get("tts_speed_variation") or 0.0,
+        "variants": settings.get("tts_variant_count") or 8,
+    }
+    overrides = (settings.get("tts_voice_variation") or {}).get(character_name(speaktone_file), {})
+    variation.update(overrides)
+    if not variation["pitch_semitones"] and not variation["speed"]:
+        return None
+    return variation
+
+
+def build_variants(buffer, pitch_semitones, speed, count, seed=0):
+    """
+    Precomputes count pitch/speed variants of a tone. Pitch is a resampling factor drawn from
+    +-pitch_semitones; speed (e.g. 0.1 for +-10%) then shortens the variant with a short fade or
+    pads it with silence. All variants are resampled in one np.interp call per channel.
+    """
+    data = buffer['data']
+    frames, channels = data.shape
+    if frames < 2 or count < 1:
+        return [buffer]
+    rng = np.random.default_rng(seed)
+    factors = 2.0 ** (rng.uniform(-pitch_semitones, pitch_semitones, count) / 12.0)
+    speeds = rng.uniform(1.0 - speed, 1.0 + speed, count)
+
+    lengths = ((frames - 1) / factors).astype(np.int64) + 1
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    index = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+    positions = index * np.repeat(factors, lengths)
+    source = np.arange(frames)
+    samples = data.astype(np.float32)
+    resampled = np.empty((len(positions), channels), dtype=np.float32)
+    for ch in range(channels):
+        resampled[:, ch] = np.interp(positions, source, samples[:, ch])
+
+    fade = 64
+    variants = []
+    for piece, variant_speed in zip(np.split(resampled, starts[1:]), speeds):
+        target = max(1, int(round(len(piece) / variant_speed)))
+        if target < len(piece):
+            piece = piece[:target].copy()
+            tail = min(fade, target)
+            piece[-tail:] *= np.linspace(1.0, 0.0, tail, dtype=np.float32)[:, None]
+        elif target > len(piece):
+            piece = np.concatenate((piece, np.zeros((target - len(piece), channels), dtype=np.float32)))
+        if np.issubdtype(data.dtype, np.integer):
+            piece = np.clip(np.rint(piece), -32768, 32767)
+        variants.append({'data': piece.astype(data.dtype), 'scale': buffer['scale']})
+    return variants
+
+
+def _decode_tone(path, sample_rate, volume_db, store_dtype):
+    # Native channel count, one compact copy
+    return from_decoded(decode(path, sample_rate), volume_db, store_dtype)
+
+
+def load_tone_bank(tones_path, selected_speaktone, sample_rate, volume_db, store_dtype="int16", variation=None):
+    """
+    Loads the given SpeakTone or VSpeakTone set.
+    Returns:
+        - speak_tone: sample buffer (see sample_store) for normal SpeakTone or None if using variated
+        - variated_speak_tones: list of sample buffers if using VSpeakTone or variation, else []
+    With variation (see voice_variation) every tone is expanded into its precomputed variants
+    here, so rendering only ever picks among ready buffers.
+    """
+    speak_tone, variated_tones = _load_tones(tones_path, selected_speaktone, sample_rate, volume_db, store_dtype)
+    if not variation:
+        return speak_tone, variated_tones
+    # Seeded by file name so every process (GUI, batch workers) builds the same variants
+    seed = zlib.crc32((selected_speaktone or "").encode("utf-8"))
+    expanded = []
+    for i, tone in enumerate(variated_tones or [speak_tone]):
+        expanded.extend(build_variants(tone, variation["pitch_semitones"], variation["speed"],
+                                       int(variation["variants"]), seed=seed + i))
+    return speak_tone, expanded
+
+
+def _load_tones(tones_path, selected_speaktone, sample_rate, volume_db, store_dtype):
+    try:
+        if not os.path.exists(tones_path):
+            os.makedirs(tones_path)
+        speak_tone_path = None
+
+        # Check for VSpeakTone selection (e.g. tenna--VSpeakTone1.ogg)
+        vspeak_match = VSPEAK_PATTERN.match(selected_speaktone or "")
+        if vspeak_match:
+            base = vspeak_match.group(1)
+            # Load all matching VSpeakTone files for this base
+            vtones = []
+            for f in os.listdir(tones_path):
+                m = VSPEAK_PATTERN.match(f)
+                if m and m.group(1).lower() == base.lower():
+                    vtones.append(os.path.join(tones_path, f))
+            vtones.sort()
+            variated_tones = [_decode_tone(path, sample_rate, volume_db, store_dtype) for path in vtones]
+            if not variated_tones:
+                logger.warning("No VSpeakTone files found. Using silence.")
+                return None, [silence(sample_rate, store_dtype)]
+            return None, variated_tones
+
+        # Otherwise, use normal SpeakTone
+        if selected_speaktone:
+            candidate = os.path.join(tones_path, selected_speaktone)
+            if os.path.exists(candidate):
+                speak_tone_path = candidate
+        if not speak_tone_path:
+            # Fallback: first available -SpeakTone file (any extension, not variated)
+            speak_tone_path = next(
+                (os.path.join(tones_path, f)
+                 for f in os.listdir(tones_path)
+                 if SPEAK_PATTERN.match(f)),
+                None)
+        if not speak_tone_path:
+            logger.warning("No speak tone file found. Using silence.")
+            return silence(sample_rate, store_dtype), []
+        return _decode_tone(speak_tone_path, sample_rate, volume_db, store_dtype), []
+
+    except Exception as e:
+        logger.error(f"Error loading speak tone: {e}")
+        return silence(sample_rate, store_dtype), []
+
+
+def render_tts(speak_tone, variated_speak_tones, text, sample_rate, pause_ms, volume_db, rng=random,
+               store_dtype="int16"):
+    """
+    Renders text to a compact stereo sample buffer: one tone per character, a pause per space.
+    Variated banks pick a random tone per character without repeating the previous one.
+    The result is levelled to volume_db, like any other sound effect.
+    """
+    tones = variated_speak_tones or ([speak_tone] if speak_tone else [])
+    if not tones:
+        logger.warning("No speak tone loaded for TTS.")
+        return None
+    pause = np.zeros((int(sample_rate * pause_ms / 1000), 2), dtype=np.float32)
+    pieces = []
+    expanded = {}
+    last_idx = None
+    for char in text:
+        if char == ' ':
+            pieces.append(pause)
+            continue
+        idx = 0
+        if len(tones) > 1:
+            idx = rng.randint(0, len(tones) - 1)
+            while idx == last_idx:
+                idx = rng.randint(0, len(tones) - 1)
+        if idx not in expanded:
+            expanded[idx] = to_float(tones[idx], 2)
+        pieces.append(expanded[idx])
+        last_idx = idx
+    if not pieces:
+        return None
+    samples = np.concatenate(pieces)
+    rms = np.sqrt(np.mean(np.square(samples, dtype=np.float64)))
+    if rms > 0:
+        samples *= db_to_gain(volume_db) / rms
+    return from_float(samples, store_dtype)